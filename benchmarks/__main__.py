@@ -0,0 +1,247 @@
+"""适配器热点路径的基准测试
+
+用法::
+
+    python -m benchmarks [-o result.json] [-k 关键字] [--repeat 5]
+
+结果以 JSON 输出，包含 Python 与 pydantic 版本，可在不同版本之间直接对比。
+"""
+
+import argparse
+import json
+import platform
+import sys
+import timeit
+from types import SimpleNamespace
+from typing import Callable, Dict, List
+
+from nonebot.adapters.dodo.bot import Bot, _check_at_me
+from nonebot.adapters.dodo.codec import get_codec
+from nonebot.adapters.dodo.event import (
+    ChannelMessageEvent,
+    EventSubject,
+    EventType,
+    parse_event,
+)
+from nonebot.adapters.dodo.message import Message, MessageSegment, _tokenize
+from nonebot.adapters.dodo.models import (
+    ApiReturn,
+    BotInfo,
+    CardButton,
+    CardButtonGroup,
+    CardImageGroup,
+    CardMessage,
+    CardText,
+    CardTitle,
+    TextData,
+    TextMessage,
+)
+from nonebot.compat import PYDANTIC_V2, model_dump, type_validate_python
+from nonebot.drivers import URL, Response
+
+from pydantic import VERSION as PYDANTIC_VERSION
+
+from .payloads import event_frame, member_list_response, mention_text
+
+BENCHMARKS: Dict[str, Callable[[], object]] = {}
+
+
+def bench(name: str):
+    def decorator(func: Callable[[], object]) -> Callable[[], object]:
+        BENCHMARKS[name] = func
+        return func
+
+    return decorator
+
+
+# 事件解析 #
+
+FRAMES = {event_type.value: event_frame(event_type.value) for event_type in EventType}
+JSON = get_codec("json")
+
+bench("frame.json_loads")(lambda: JSON.loads(FRAMES["2001"]))
+
+for _type, _frame in FRAMES.items():
+    bench(f"event.union.{_type}")(
+        lambda frame=_frame: type_validate_python(EventSubject, JSON.loads(frame))
+    )
+    bench(f"event.registry.{_type}")(
+        lambda frame=_frame: parse_event(JSON.loads(frame)["data"])
+    )
+    bench(f"event.lazy.{_type}")(
+        lambda frame=_frame: parse_event(JSON.loads(frame)["data"], lazy=True)
+    )
+    # nonebot logs every event before matching, so this is the real handling cost
+    bench(f"event.log_string.{_type}")(
+        lambda frame=_frame: parse_event(JSON.loads(frame)["data"]).get_log_string()
+    )
+    bench(f"event.lazy.log_string.{_type}")(
+        lambda frame=_frame: parse_event(
+            JSON.loads(frame)["data"], lazy=True
+        ).get_log_string()
+    )
+
+
+# 消息 #
+
+LONG_TEXT = mention_text(4000)
+LONG_BODY = TextMessage(content=LONG_TEXT)
+LONG_MESSAGE = Message(LONG_TEXT)
+
+
+def construct_uncached() -> Message:
+    _tokenize.cache_clear()
+    return Message(LONG_TEXT)
+
+
+bench("message.construct.4k_mentions")(lambda: Message(LONG_TEXT))
+bench("message.construct.4k_mentions.uncached")(construct_uncached)
+bench("message.from_message_body.4k_mentions")(
+    lambda: Message.from_message_body(LONG_BODY)
+)
+bench("message.to_message_body.4k_mentions")(lambda: LONG_MESSAGE.to_message_body())
+
+BOT = SimpleNamespace(
+    bot_info=BotInfo(
+        client_id="1",
+        dodo_source_id="1000000",
+        nick_name="bot",
+        avatar_url="https://img.imdodo.com/a.png",
+    ),
+    adapter=SimpleNamespace(
+        codec=JSON, api_base=URL("https://botopen.imdodo.com/api/v2")
+    ),
+)
+
+
+def fresh_event(event: ChannelMessageEvent) -> ChannelMessageEvent:
+    """复制出未解析过消息的事件，避免缓存的消息影响结果"""
+    return event.model_copy() if PYDANTIC_V2 else event.copy()  # type: ignore
+
+
+EVENT = parse_event(JSON.loads(event_frame("2001"))["data"])
+assert isinstance(EVENT, ChannelMessageEvent)
+LONG_EVENT = fresh_event(EVENT)
+LONG_EVENT.message_body = TextMessage(content=f"<@!1000000> {LONG_TEXT}")
+
+bench("event.get_message.4k_mentions")(lambda: fresh_event(LONG_EVENT).get_message())
+bench("check_at_me.short")(lambda: _check_at_me(BOT, fresh_event(EVENT)))  # type: ignore
+bench("check_at_me.4k_mentions")(
+    lambda: _check_at_me(BOT, fresh_event(LONG_EVENT))  # type: ignore
+)
+
+
+# API 响应 #
+
+RESPONSES = {
+    "small": Response(200, content=b'{"status":0,"message":"success","data":{}}'),
+    "list_100": Response(200, content=member_list_response(100)),
+}
+
+for _name, _response in RESPONSES.items():
+    bench(f"response.baseline.{_name}")(
+        lambda response=_response: type_validate_python(
+            ApiReturn, json.loads(response.content)
+        )
+    )
+    bench(f"response.handle.{_name}")(
+        lambda response=_response: Bot._handle_response(BOT, response)  # type: ignore
+    )
+
+
+# 卡片 #
+
+CARD = MessageSegment.card(
+    [
+        CardTitle(text=TextData(type="plain-text", content="每日签到")),
+        CardText(text=TextData(type="dodo-md", content="**签到成功** " * 10)),
+        type_validate_python(
+            CardImageGroup,
+            {
+                "elements": [
+                    {"src": f"https://img.imdodo.com/{i}.png"} for i in range(9)
+                ]
+            },
+        ),
+        CardButtonGroup(
+            elements=[
+                type_validate_python(
+                    CardButton,
+                    {"click": {"action": "call_back"}, "name": f"按钮{i}"},
+                )
+                for i in range(4)
+            ]
+        ),
+    ],
+    title="签到",
+).data["card"]
+assert isinstance(CARD, CardMessage)
+
+bench("card.model_dump")(lambda: model_dump(CARD, by_alias=True, exclude_none=True))
+
+# 发送请求的构造与编码，即驱动发送前的全部序列化开销
+PREPARED_CARD = Bot.prepare_message(BOT, CARD)  # type: ignore
+
+bench("send.request.card")(
+    lambda: JSON.dumps(
+        Bot._message_request(
+            BOT,  # type: ignore
+            "channel/message/send",
+            {"channelId": "1254631"},
+            None,
+            CARD,
+        ).json
+    )
+)
+bench("send.request.card.prepared")(
+    lambda: Bot._message_request(
+        BOT,  # type: ignore
+        "channel/message/send",
+        {"channelId": "1254631"},
+        None,
+        PREPARED_CARD,
+    ).content
+)
+
+
+def run(names: List[str], repeat: int) -> Dict[str, Dict[str, float]]:
+    results: Dict[str, Dict[str, float]] = {}
+    for name in names:
+        timer = timeit.Timer(BENCHMARKS[name])
+        number, _ = timer.autorange()
+        best = min(timer.repeat(repeat=repeat, number=number)) / number
+        results[name] = {
+            "mean_us": round(best * 1e6, 3),
+            "ops_per_sec": round(1 / best, 1),
+            "number": number,
+        }
+        sys.stderr.write(f"{name:<45} {best * 1e6:>12.2f} us\n")
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    parser.add_argument("-o", "--output", help="结果 JSON 输出路径，默认输出到标准输出")
+    parser.add_argument(
+        "-k", "--keyword", default="", help="只运行名称包含该关键字的用例"
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="每个用例的重复轮数")
+    args = parser.parse_args()
+
+    names = [name for name in BENCHMARKS if args.keyword in name]
+    report = {
+        "python": platform.python_version(),
+        "pydantic": PYDANTIC_VERSION,
+        "pydantic_v2": PYDANTIC_V2,
+        "results": run(names, args.repeat),
+    }
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        sys.stdout.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
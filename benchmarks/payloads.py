@@ -0,0 +1,219 @@
+"""基准测试使用的事件与 API 响应数据
+
+结构与 DoDo 开放平台推送及返回的数据一致，内容为脱敏后的合成数据。
+"""
+
+import json
+from typing import Any, Dict, List
+
+PERSONAL = {
+    "nickName": "测试用户",
+    "avatarUrl": "https://img.imdodo.com/a.png",
+    "sex": 1,
+}
+MEMBER = {"nickName": "群昵称", "joinTime": "2023-01-01 12:00:00"}
+ISLAND = {"islandSourceId": "260529", "channelId": "1254631"}
+
+EVENT_BODIES: Dict[str, Dict[str, Any]] = {
+    "2001": {
+        **ISLAND,
+        "dodoSourceId": "2343553",
+        "personal": PERSONAL,
+        "member": MEMBER,
+        "messageId": "238764212",
+        "messageType": 1,
+        "messageBody": {"content": "<@!1234567> 帮我查一下今天的签到 <#1254631>"},
+        "reference": {
+            "messageId": "238764200",
+            "dodoSourceId": "1234567",
+            "nickName": "bot",
+        },
+    },
+    "3001": {
+        **ISLAND,
+        "dodoSourceId": "2343553",
+        "messageId": "238764212",
+        "personal": PERSONAL,
+        "member": MEMBER,
+        "reactionTarget": {"type": 0, "id": "238764212"},
+        "reactionEmoji": {"type": 1, "id": "128077"},
+        "reactionType": 1,
+    },
+    "3002": {
+        **ISLAND,
+        "dodoSourceId": "2343553",
+        "messageId": "238764212",
+        "personal": PERSONAL,
+        "member": MEMBER,
+        "interactCustomId": "sign",
+        "value": "sign_in",
+    },
+    "3003": {
+        **ISLAND,
+        "dodoSourceId": "2343553",
+        "messageId": "238764212",
+        "personal": PERSONAL,
+        "member": MEMBER,
+        "interactCustomId": "form",
+        "formData": [{"key": "name", "value": "test"}, {"key": "qq", "value": "1"}],
+    },
+    "3004": {
+        **ISLAND,
+        "dodoSourceId": "2343553",
+        "messageId": "238764212",
+        "personal": PERSONAL,
+        "member": MEMBER,
+        "interactCustomId": "list",
+        "listData": [{"name": "选项一"}, {"name": "选项二"}],
+    },
+    "5001": {
+        **ISLAND,
+        "dodoSourceId": "2343553",
+        "personal": PERSONAL,
+        "member": MEMBER,
+    },
+    "5002": {
+        **ISLAND,
+        "dodoSourceId": "2343553",
+        "personal": PERSONAL,
+        "member": MEMBER,
+    },
+    "6001": {
+        **ISLAND,
+        "dodoSourceId": "2343553",
+        "personal": PERSONAL,
+        "member": MEMBER,
+        "articalId": "12345",
+        "title": "公告",
+        "imageList": ["https://img.imdodo.com/b.png"],
+        "content": "帖子内容" * 20,
+    },
+    "6002": {
+        **ISLAND,
+        "dodoSourceId": "2343553",
+        "personal": PERSONAL,
+        "member": MEMBER,
+        "articalId": "12345",
+        "commentId": "23456",
+        "replyId": "34567",
+        "imageList": [],
+        "content": "评论内容",
+    },
+    "4001": {
+        "islandSourceId": "260529",
+        "dodoSourceId": "2343553",
+        "personal": PERSONAL,
+        "modifyTime": "2023-01-01 12:00:00",
+    },
+    "4002": {
+        "islandSourceId": "260529",
+        "dodoSourceId": "2343553",
+        "personal": PERSONAL,
+        "leaveType": 1,
+        "operateDodoSourceId": "",
+        "modifyTime": "2023-01-01 12:00:00",
+    },
+    "4003": {
+        "islandSourceId": "260529",
+        "dodoSourceId": "2343553",
+        "dodoIslandNickName": "邀请人",
+        "toDodoSourceId": "3456789",
+        "toDodoIslandNickName": "被邀请人",
+    },
+    "7001": {
+        **ISLAND,
+        "dodoSourceId": "2343553",
+        "orderNo": "202301010001",
+        "targetType": 1,
+        "targetId": "238764212",
+        "totalAmount": 10.0,
+        "gift": {"id": "1", "name": "鲜花", "count": 1},
+        "islandRatio": 0.3,
+        "islandIncome": 3.0,
+        "dodoIslandNickName": "赠送人",
+        "toDodoSourceId": "3456789",
+        "toDodoIslandNickName": "接收人",
+        "toDodoRatio": 0.5,
+        "toDodoIncome": 5.0,
+    },
+    "8001": {
+        "islandSourceId": "260529",
+        "dodoSourceId": "2343553",
+        "operateType": 1,
+        "integral": 10,
+    },
+    "9001": {
+        "islandSourceId": "260529",
+        "dodoSourceId": "2343553",
+        "orderNo": "202301010002",
+        "goodsType": 1,
+        "goodsId": "1",
+        "goodsName": "身份组",
+        "goodsImageList": [],
+    },
+    "1001": {
+        "islandSourceId": "260529",
+        "dodoSourceId": "2343553",
+        "personal": PERSONAL,
+        "messageId": "238764213",
+        "messageType": 1,
+        "messageBody": {"content": "你好"},
+    },
+}
+
+
+def event_frame(event_type: str) -> str:
+    """WebSocket 推送的原始事件帧"""
+    return json.dumps(
+        {
+            "type": 0,
+            "data": {
+                "eventId": "e5a0b0c4a1b64b3f9c2d",
+                "eventType": event_type,
+                "eventBody": EVENT_BODIES[event_type],
+                "timestamp": 1672545600,
+            },
+            "version": "v2",
+        }
+    )
+
+
+def mention_text(length: int) -> str:
+    """频道中常见的含大量艾特、频道链接的长文本"""
+    parts: List[str] = []
+    i = 0
+    while sum(map(len, parts)) < length:
+        parts.append(
+            f"第{i}条 <@!{1000000 + i}> 请查看 <#{2000000 + i}> "
+            f"<@&{3000 + i}> 的通知，谢谢！"
+        )
+        i += 1
+    return "".join(parts)
+
+
+def member_list_response(count: int) -> bytes:
+    """get_member_list 的响应体"""
+    return json.dumps(
+        {
+            "status": 0,
+            "message": "success",
+            "data": {
+                "maxId": count,
+                "list": [
+                    {
+                        "dodoSourceId": str(1000000 + i),
+                        "nickName": f"成员{i}",
+                        "personalNickName": f"用户{i}",
+                        "avatarUrl": "https://img.imdodo.com/a.png",
+                        "joinTime": "2023-01-01 12:00:00",
+                        "sex": 1,
+                        "level": 3,
+                        "isBot": False,
+                        "onlineDevice": 1,
+                        "onlineStatus": 1,
+                    }
+                    for i in range(count)
+                ],
+            },
+        }
+    ).encode()
@@ -8,4 +8,6 @@ from .exception import (
 from .message import (
     Message as Message,
     MessageSegment as MessageSegment,
+    PreparedMessage as PreparedMessage,
 )
+from .picture import picture_size as picture_size
@@ -1,11 +1,9 @@
 import asyncio
-import json
 from typing import Any, List, Optional
 from typing_extensions import override
 
 from nonebot import get_plugin_config
 from nonebot.adapters import Adapter as BaseAdapter
-from nonebot.compat import type_validate_python
 from nonebot.drivers import (
     URL,
     Driver,
@@ -18,9 +16,15 @@ from nonebot.exception import WebSocketClosed
 from nonebot.utils import escape_tag
 
 from .bot import Bot
+from .codec import get_codec
 from .config import BotConfig, Config
-from .event import EventSubject
+from .connection import Backoff
+from .event import parse_event
 from .exception import ApiNotAvailable
+from .metrics import AdapterMetrics, MetricsExporter, PrometheusExporter
+from .picture import PictureCache
+from .shard import ShardReporter, ShardSupervisor
+from .startup import StartupScheduler
 from .utils import API, log
 
 
@@ -29,8 +33,35 @@ class Adapter(BaseAdapter):
     def __init__(self, driver: Driver, **kwargs: Any):
         super().__init__(driver, **kwargs)
         self.dodo_config = get_plugin_config(Config)
+        self.codec = get_codec(self.dodo_config.json_codec)
         self.api_base: URL = URL("https://botopen.imdodo.com/api/v2")
         self.tasks: List["asyncio.Task"] = []
+        self.picture_cache: Optional[PictureCache] = (
+            PictureCache(
+                self.dodo_config.picture_cache_ttl,
+                self.dodo_config.picture_cache_size,
+                self.dodo_config.picture_cache_path,
+            )
+            if self.dodo_config.picture_cache
+            else None
+        )
+        """所有机器人共用的图片上传缓存，未开启时为 `None`"""
+        self.shard_supervisor: Optional[ShardSupervisor] = None
+        """分片模式下主进程的分片管理"""
+        self.startup_scheduler = StartupScheduler(
+            concurrency=self.dodo_config.startup_concurrency,
+            interval=self.dodo_config.startup_interval,
+            retries=self.dodo_config.startup_retries,
+            backoff=lambda: Backoff(
+                self.dodo_config.reconnect_initial_delay,
+                self.dodo_config.reconnect_max_delay,
+            ),
+        )
+        """机器人启动调度，可通过 `report()` 获取各机器人的启动情况"""
+        self.metrics: Optional[AdapterMetrics] = (
+            AdapterMetrics(self) if self.dodo_config.metrics else None
+        )
+        """适配器指标，未开启时为 `None`"""
         self.setup()
 
     @classmethod
@@ -51,12 +82,41 @@ class Adapter(BaseAdapter):
                 "websocket client! "
                 "DoDo Adapter need a WebSocketClient Driver to work."
             )
+        if self.metrics is not None and self.dodo_config.metrics_path:
+            self.add_metrics_exporter(PrometheusExporter(self.dodo_config.metrics_path))
         self.on_ready(self.startup)
         self.driver.on_shutdown(self.shutdown)
 
+    def add_metrics_exporter(self, exporter: MetricsExporter) -> None:
+        """添加指标导出器，需要开启 `DODO_METRICS`"""
+        if self.metrics is None:
+            raise RuntimeError("Metrics are not enabled, set DODO_METRICS=true first")
+        exporter.setup(self, self.metrics)
+
     async def startup(self) -> None:
-        for bot in self.dodo_config.bots:
-            self.tasks.append(asyncio.create_task(self.run_bot(bot)))
+        config = self.dodo_config
+        if config.shard_id is None and config.shards > 1:
+            self.shard_supervisor = ShardSupervisor(self, config.shards)
+            self.tasks.append(asyncio.create_task(self.shard_supervisor.run()))
+            return
+
+        if self.picture_cache is not None:
+            await self.picture_cache.open()
+        bots = config.bots
+        if config.shard_id is not None:
+            bots = bots[config.shard_id :: config.shards]
+            log("INFO", f"Running shard {config.shard_id} with {len(bots)} bots")
+            if config.shard_report_port is not None:
+                reporter = ShardReporter(
+                    self,
+                    config.shard_id,
+                    config.shard_report_port,
+                    config.shard_report_interval,
+                )
+                self.tasks.append(asyncio.create_task(reporter.run()))
+        self.tasks.append(
+            asyncio.create_task(self.startup_scheduler.run(bots, self.run_bot))
+        )
 
     async def shutdown(self) -> None:
         for task in self.tasks:
@@ -67,28 +127,30 @@ class Adapter(BaseAdapter):
             *(asyncio.wait_for(task, timeout=10) for task in self.tasks),
             return_exceptions=True,
         )
+        if self.picture_cache is not None:
+            await self.picture_cache.close()
 
-    async def run_bot(self, bot_info: BotConfig) -> None:
+    async def run_bot(self, bot_info: BotConfig) -> Bot:
+        """获取机器人信息与连接地址后开始连接，失败时抛出异常"""
         bot = Bot(self, bot_info.client_id, bot_info)
         await bot.get_bot_info()
-        try:
-            ws_result = await bot.get_websocket_connection()
-            ws_url = URL(ws_result.endpoint)
-        except Exception as e:
-            log(
-                "ERROR",
-                "<r><bg #f8bbd0>Failed to get websocket url.</bg #f8bbd0></r>",
-                e,
-            )
-            return
+        ws_result = await bot.get_websocket_connection()
+        ws_url = URL(ws_result.endpoint)
 
+        self.tasks.extend(bot.dispatcher.start())
         self.tasks.append(asyncio.create_task(self._forward_ws(bot, ws_url)))
+        return bot
 
-    async def _forward_ws(self, bot: Bot, ws_url: URL) -> None:
-        request = Request("GET", ws_url, timeout=30.0)
+    async def _forward_ws(self, bot: Bot, ws_url: Optional[URL]) -> None:
+        config = self.dodo_config
+        backoff = Backoff(config.reconnect_initial_delay, config.reconnect_max_delay)
         heartbeat_task: Optional["asyncio.Task"] = None
+        loop_task: Optional["asyncio.Task"] = None
         while True:
             try:
+                if ws_url is None:
+                    ws_url = URL((await bot.get_websocket_connection()).endpoint)
+                request = Request("GET", ws_url, timeout=30.0)
                 async with self.websocket(request) as ws:
                     log(
                         "DEBUG",
@@ -105,10 +167,34 @@ class Adapter(BaseAdapter):
                     except Exception:
                         pass
                     try:
+                        bot.connection.on_connect()
+                        if bot.connection.reconnects:
+                            if self.metrics is not None:
+                                self.metrics.reconnects.inc(bot=bot.self_id)
+                                self.metrics.outage.observe(
+                                    bot.connection.last_outage, bot=bot.self_id
+                                )
+                            log(
+                                "INFO",
+                                f"Bot {bot.self_id} reconnected after "
+                                f"{bot.connection.last_outage:.1f}s",
+                            )
                         self.bot_connect(bot)
-                        heartbeat_task = asyncio.create_task(self._heartbeat(ws))
-
-                        await self._loop(bot, ws)
+                        heartbeat_task = asyncio.create_task(self._heartbeat(bot, ws))
+                        loop_task = asyncio.create_task(self._loop(bot, ws))
+                        await asyncio.wait(
+                            (heartbeat_task, loop_task),
+                            return_when=asyncio.FIRST_COMPLETED,
+                        )
+                        if not loop_task.done():
+                            loop_task.cancel()
+                            # errors such as a failed send are raised as they are,
+                            # the heartbeat only returns after missing too many
+                            heartbeat_task.result()
+                            raise ConnectionError(
+                                f"Missed {config.heartbeat_max_missed} heartbeats"
+                            )
+                        loop_task.result()
                     except WebSocketClosed as e:
                         log(
                             "ERROR",
@@ -130,6 +216,9 @@ class Adapter(BaseAdapter):
                         if heartbeat_task:
                             heartbeat_task.cancel()
                             heartbeat_task = None
+                        if loop_task:
+                            loop_task.cancel()
+                            loop_task = None
                         self.bot_disconnect(bot)
             except Exception as e:
                 log(
@@ -137,36 +226,94 @@ class Adapter(BaseAdapter):
                     (
                         "<r><bg #f8bbd0>"
                         "Error while setup websocket to "
-                        f"{escape_tag(str(ws_url))}. Trying to reconnect..."
+                        f"{escape_tag(str(ws_url or 'DoDo'))}. Trying to reconnect..."
                         "</bg #f8bbd0></r>"
                     ),
                     e,
                 )
-            await asyncio.sleep(5.0)
+            # the endpoint may have expired, get a new one before reconnecting
+            ws_url = None
+            if bot.connection.on_disconnect() >= config.reconnect_stable_after:
+                backoff.reset()
+            await asyncio.sleep(backoff.next())
+
+    async def _heartbeat(self, bot: Bot, ws: WebSocket):
+        """心跳
 
-    async def _heartbeat(self, ws: WebSocket):
-        """心跳"""
+        连续 `heartbeat_max_missed` 次未在超时内收到回复时返回，由调用方断开重连。
+        """
+        config = self.dodo_config
+        heartbeat = bot.connection.heartbeat
         while True:
-            await asyncio.sleep(25.0)
-            await ws.send(json.dumps({"type": 1}))
+            await asyncio.sleep(config.heartbeat_interval)
+            heartbeat.on_send()
+            data = self.codec.dumps({"type": 1})
+            await ws.send(data)
+            if self.metrics is not None:
+                self.metrics.bytes.inc(
+                    len(data), bot=bot.self_id, transport="websocket", direction="out"
+                )
             log("TRACE", "Send Heartbeat")
+            timeout = heartbeat.timeout(
+                config.heartbeat_min_timeout, config.heartbeat_interval
+            )
+            if not await heartbeat.wait_reply(timeout):
+                log(
+                    "WARNING",
+                    f"Bot {bot.self_id} missed heartbeat reply "
+                    f"({heartbeat.consecutive_missed}/{config.heartbeat_max_missed})",
+                )
+                if heartbeat.consecutive_missed >= config.heartbeat_max_missed:
+                    return
 
     async def _loop(self, bot: Bot, ws: WebSocket):
+        metrics = self.metrics
         while True:
-            payload = json.loads(await ws.receive())
+            data = await ws.receive()
+            if metrics is not None:
+                # text frames are counted in characters to avoid encoding a copy
+                metrics.bytes.inc(
+                    len(data),
+                    bot=bot.self_id,
+                    transport="websocket",
+                    direction="in",
+                )
+            payload = self.codec.loads(data)
             if payload["type"] == 1:
+                bot.connection.heartbeat.on_reply()
                 log("TRACE", f"Receive Heartbeat: {payload}")
                 continue
+            if (
+                bot.deduplicator is not None
+                and (event_id := payload["data"].get("eventId"))
+                and bot.deduplicator.is_duplicate(event_id)
+            ):
+                log("DEBUG", f"Drop duplicate event {event_id}")
+                continue
+            event_type = payload["data"].get("eventType")
+            if metrics is not None:
+                metrics.events_received.inc(bot=bot.self_id, event_type=event_type)
             try:
-                event_subject = type_validate_python(EventSubject, payload)
+                event = parse_event(payload["data"], lazy=self.dodo_config.lazy_event)
             except Exception as e:
+                if metrics is not None:
+                    metrics.events_failed.inc(
+                        bot=bot.self_id, event_type=event_type, stage="parse"
+                    )
                 log(
                     "WARNING",
                     f"Failed to parse payload {payload}",
                     e,
                 )
             else:
-                asyncio.create_task(bot.handle_event(event_subject.data))
+                if metrics is not None:
+                    metrics.events_parsed.inc(bot=bot.self_id, event_type=event_type)
+                if bot.dispatcher.full():
+                    # heartbeat replies stay unread while waiting for the queue
+                    with bot.connection.heartbeat.suspend():
+                        await bot.dispatcher.put(event)
+                else:
+                    await bot.dispatcher.put(event)
 
     @override
     async def _call_api(self, bot: Bot, api: str, **data: Any) -> Any:
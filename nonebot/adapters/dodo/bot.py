@@ -1,7 +1,24 @@
-from io import BytesIO
-import json
-from pathlib import Path
-from typing import TYPE_CHECKING, Any, List, NoReturn, Optional, Union
+import asyncio
+from contextlib import AsyncExitStack
+import time
+from typing import (
+    IO,
+    TYPE_CHECKING,
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    NoReturn,
+    Optional,
+    Set,
+    Tuple,
+    TypeVar,
+    Union,
+)
 from typing_extensions import override
 
 from nonebot.adapters import Bot as BaseBot
@@ -9,20 +26,40 @@ from nonebot.compat import model_dump, type_validate_python
 from nonebot.drivers import Request, Response
 from nonebot.message import handle_event
 
+from .cache import ApiCache, SingleFlight, cached, coalesced, invalidates
+from .compat import model_copy
 from .config import BotConfig
-from .event import ChannelMessageEvent, Event, PersonalMessageEvent
+from .connection import ConnectionState
+from .dispatcher import EventDeduplicator, EventDispatcher
+from .event import (
+    ChannelMessageEvent,
+    Event,
+    MemberJoinEvent,
+    MemberLeaveEvent,
+    PersonalMessageEvent,
+)
 from .exception import (
     ActionFailed,
     NetworkError,
     RateLimitException,
     UnauthorizedException,
 )
-from .message import Message, MessageSegment
+from .message import (
+    CardSegment,
+    Message,
+    MessageSegment,
+    PictureSegment,
+    PreparedMessage,
+)
+from .metrics import AdapterMetrics
 from .models import (
     ApiReturn,
     BotInfo,
     BotInviteInfo,
     BussinessType,
+    CardImage,
+    CardImageGroup,
+    CardMessage,
     ChannelArticleData,
     ChannelData,
     ChannelInfo,
@@ -56,11 +93,65 @@ from .models import (
     TargetType,
     WebSocketConnectionData,
 )
-from .utils import API, exclude_none
+from .picture import (
+    PROBE_SIZE,
+    PictureFile,
+    PictureProcessor,
+    open_picture,
+    picture_hash,
+    picture_size,
+)
+from .ratelimit import RateLimiter
+from .utils import API, exclude_none, log
 
 if TYPE_CHECKING:
     from .adapter import Adapter
 
+T = TypeVar("T")
+
+
+def _rewind_files(request: Request) -> None:
+    """重试前将请求中的文件对象移回开头"""
+    for _, (_, content, _) in request.files or ():
+        if not isinstance(content, bytes):
+            content.seek(0)
+
+
+def _request_size(request: Request) -> int:
+    """请求体的字节数，不包括表单字段"""
+    size = 0
+    if isinstance(request.content, str):
+        size += len(request.content.encode())
+    elif isinstance(request.content, bytes):
+        size += len(request.content)
+    for _, (_, content, _) in request.files or ():
+        if isinstance(content, bytes):
+            size += len(content)
+        else:
+            size += content.seek(0, 2)
+            content.seek(0)
+    return size
+
+
+def _with_uploaded_images(
+    body: CardMessage, uploaded: Callable[[PictureFile], PictureInfo]
+) -> CardMessage:
+    """复制卡片，将其中的本地图片替换为上传后的链接"""
+
+    def image(image: CardImage) -> CardImage:
+        return image if image.file is None else CardImage(src=uploaded(image.file).url)
+
+    components = []
+    for component in body.card.components:
+        if isinstance(component, CardImage):
+            component = image(component)
+        elif isinstance(component, CardImageGroup):
+            component = model_copy(
+                component, {"elements": [image(e) for e in component.elements]}
+            )
+        components.append(component)
+    return model_copy(body, {"card": model_copy(body.card, {"components": components})})
+
 
 def _check_at_me(
     bot: "Bot",
@@ -123,6 +214,47 @@ class Bot(BaseBot):
         super().__init__(adapter, self_id)
         self.bot_config = bot_config
         self.bot_info: Optional[BotInfo] = None
+        config = adapter.dodo_config
+        self.dispatcher = EventDispatcher(
+            self,
+            max_size=config.dispatch_queue_size,
+            workers=config.dispatch_workers,
+            overflow=config.dispatch_overflow,
+            drop_event_types=config.dispatch_drop_event_types,
+            ordered=config.dispatch_ordered,
+        )
+        self.deduplicator: Optional[EventDeduplicator] = (
+            EventDeduplicator(config.event_dedup_window, config.event_dedup_size)
+            if config.event_dedup_window > 0
+            else None
+        )
+        self.rate_limiter: Optional[RateLimiter] = (
+            RateLimiter(
+                config.rate_limit_bot_rate,
+                config.rate_limit_route_rate,
+                config.rate_limit_pause,
+            )
+            if config.rate_limit
+            else None
+        )
+        self.connection = ConnectionState()
+        self.single_flight = SingleFlight()
+        self.api_cache: Optional[ApiCache] = (
+            ApiCache(config.api_cache_ttl, config.api_cache_size)
+            if config.api_cache
+            else None
+        )
+        self.upload_slots = asyncio.Semaphore(config.upload_concurrency)
+        """同时上传的文件数限制"""
+        self.picture_processor: Optional[PictureProcessor] = (
+            PictureProcessor(
+                config.picture_max_dimension,
+                config.picture_max_bytes,
+                config.picture_quality,
+            )
+            if config.picture_max_dimension or config.picture_max_bytes
+            else None
+        )
 
     @override
     def __getattr__(self, name: str) -> NoReturn:
@@ -130,16 +262,127 @@ class Bot(BaseBot):
             f'"{self.__class__.__name__}" object has no attribute "{name}"'
         )
 
+    def prepare_message(
+        self, message: Union[str, Message, MessageSegment, MessageBody]
+    ) -> PreparedMessage:
+        """预先序列化消息，可重复传给 `send_to_*` 与消息发送 API"""
+        if isinstance(message, (str, Message, MessageSegment)):
+            body, referenced_message_id = Message(message).to_message_body()
+        else:
+            body, referenced_message_id = message, None
+        return PreparedMessage(
+            message_type=body.__type__,
+            body=self.adapter.codec.dumps(
+                model_dump(body, by_alias=True, exclude_none=True)
+            ).encode(),
+            referenced_message_id=referenced_message_id,
+        )
+
+    async def upload_pictures(self, message: Message) -> Message:
+        """并发上传消息中的本地图片并补全未指定宽高的图片，返回处理后的消息
+
+        本地图片包括卡片中的图片，宽高从网络图片的文件头读取。
+        传入的消息不会被修改，同一条消息可以同时在多处发送。
+        """
+        pictures = message.local_pictures()
+        urls = {
+            seg.data["url"]
+            for seg in message
+            if isinstance(seg, PictureSegment) and "url" in seg.data
+        }
+        if not pictures and not urls:
+            return message
+        files = {
+            id(file): file
+            for file in (
+                picture.data["file"]
+                if isinstance(picture, PictureSegment)
+                else picture.file
+                for picture in pictures
+            )
+        }
+        tasks = {
+            key: asyncio.create_task(self.set_resouce_picture_upload(file=file))
+            for key, file in files.items()
+        }
+        sizes = {url: asyncio.create_task(self.probe_picture_size(url)) for url in urls}
+        try:
+            await asyncio.gather(*tasks.values(), *sizes.values())
+        finally:
+            for task in (*tasks.values(), *sizes.values()):
+                task.cancel()
+
+        def uploaded(file: PictureFile) -> PictureInfo:
+            return tasks[id(file)].result()
+
+        result = Message()
+        for seg in message:
+            if isinstance(seg, PictureSegment) and "file" in seg.data:
+                info = uploaded(seg.data["file"])
+                seg = MessageSegment.picture(
+                    info.url, info.width, info.height, seg.data.get("is_original")
+                )
+            elif isinstance(seg, PictureSegment) and "url" in seg.data:
+                width, height = sizes[seg.data["url"]].result()
+                seg = MessageSegment.picture(
+                    seg.data["url"], width, height, seg.data.get("is_original")
+                )
+            elif isinstance(seg, CardSegment):
+                seg = CardSegment(
+                    seg.type,
+                    {"card": _with_uploaded_images(seg.message_body, uploaded)},
+                )
+            result.append(seg)
+        return result
+
+    async def probe_picture_size(self, url: str) -> Tuple[int, int]:
+        """读取网络图片的宽高，先只请求文件头，无法识别时再下载完整图片"""
+        headers = {"Range": f"bytes=0-{PROBE_SIZE - 1}"}
+        while True:
+            try:
+                response = await self.adapter.request(
+                    Request("GET", url, headers=headers)
+                )
+            except Exception as e:
+                raise NetworkError("Picture download error") from e
+            if response.status_code not in (200, 206):
+                raise NetworkError(
+                    f"Picture download error with status {response.status_code}"
+                )
+            content = response.content or b""
+            if size := picture_size(
+                content.encode() if isinstance(content, str) else content
+            ):
+                return size
+            if response.status_code != 206:
+                raise ValueError(f"Cannot read the size of picture {url}")
+            headers = {}
+
+    async def _to_message_body(
+        self, message: Union[str, Message, MessageSegment, PreparedMessage]
+    ) -> Tuple[Union[MessageBody, PreparedMessage], Optional[str]]:
+        if isinstance(message, PreparedMessage):
+            return message, message.referenced_message_id
+        message = await self.upload_pictures(Message(message))
+        return message.to_message_body()
+
+    async def _prepare(
+        self, message: Union[str, Message, MessageSegment, PreparedMessage]
+    ) -> PreparedMessage:
+        if isinstance(message, PreparedMessage):
+            return message
+        message = await self.upload_pictures(Message(message))
+        return self.prepare_message(message)
+
     async def send_to_channel(
         self,
         channel_id: str,
-        message: Union[str, Message, MessageSegment],
+        message: Union[str, Message, MessageSegment, PreparedMessage],
     ) -> str:
-        msg, referenced_message_id = Message(message).to_message_body()
+        msg, referenced_message_id = await self._to_message_body(message)
         return (
             await self.set_channel_message_send(
                 channel_id=channel_id,
-                message_type=msg.__type__,
                 message_body=msg,
                 referenced_message_id=referenced_message_id,
             )
@@ -148,14 +391,13 @@ class Bot(BaseBot):
     async def send_to_channel_personal(
         self,
         channel_id: str,
-        message: Union[str, Message, MessageSegment],
+        message: Union[str, Message, MessageSegment, PreparedMessage],
         dodo_source_id: str,
     ) -> str:
-        msg, referenced_message_id = Message(message).to_message_body()
+        msg, referenced_message_id = await self._to_message_body(message)
         return (
             await self.set_channel_message_send(
                 channel_id=channel_id,
-                message_type=msg.__type__,
                 message_body=msg,
                 referenced_message_id=referenced_message_id,
                 dodo_source_id=dodo_source_id,
@@ -166,14 +408,13 @@ class Bot(BaseBot):
         self,
         island_source_id: str,
         dodo_source_id: str,
-        message: Union[str, Message, MessageSegment],
+        message: Union[str, Message, MessageSegment, PreparedMessage],
     ) -> str:
-        msg, _ = Message(message).to_message_body()
+        msg, _ = await self._to_message_body(message)
         return (
             await self.set_personal_message_send(
                 island_source_id=island_source_id,
                 dodo_source_id=dodo_source_id,
-                message_type=msg.__type__,
                 message_body=msg,
             )
         ).message_id
@@ -201,9 +442,127 @@ class Bot(BaseBot):
             )
         raise RuntimeError("Event cannot be replied to!")
 
+    async def _send_with_retry(
+        self, send: Callable[[], Awaitable[T]], retries: int, delay: float = 1.0
+    ) -> T:
+        """发送失败于网络错误时按指数退避重试，被限流的重试由 `_request` 处理"""
+        attempt = 0
+        while True:
+            try:
+                return await send()
+            except NetworkError:
+                if attempt >= retries:
+                    raise
+                await asyncio.sleep(delay * 2**attempt)
+                attempt += 1
+
+    async def broadcast_to_channels(
+        self,
+        channel_ids: Iterable[str],
+        message: Union[str, Message, MessageSegment, PreparedMessage],
+        *,
+        concurrency: int = 10,
+        retries: int = 2,
+    ) -> Dict[str, Union[str, Exception]]:
+        """向多个频道发送同一条消息
+
+        消息只序列化一次，最多同时发送 `concurrency` 条。
+        返回每个频道的消息 ID，发送失败的频道对应其异常，不影响其他频道。
+        """
+        if concurrency < 1:
+            raise ValueError(f"concurrency must be at least 1, got {concurrency}")
+        prepared = await self._prepare(message)
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def _send(channel_id: str) -> Union[str, Exception]:
+            async with semaphore:
+                try:
+                    return await self._send_with_retry(
+                        lambda: self.send_to_channel(channel_id, prepared), retries
+                    )
+                except Exception as e:
+                    return e
+
+        targets = list(dict.fromkeys(channel_ids))
+        results = await asyncio.gather(*(_send(channel_id) for channel_id in targets))
+        return dict(zip(targets, results))
+
+    def broadcast_to_personals(
+        self,
+        island_source_id: str,
+        dodo_source_ids: Union[Iterable[str], AsyncIterable[str]],
+        message: Union[str, Message, MessageSegment, PreparedMessage],
+        *,
+        concurrency: int = 10,
+        retries: int = 2,
+    ) -> AsyncIterator[Tuple[str, Union[str, Exception]]]:
+        """向多个用户发送同一条私信
+
+        `dodo_source_ids` 可以是异步迭代器，如从 `iter_member_list` 中取出的 ID，
+        会按需读取。
+        最多同时发送 `concurrency` 条，按完成顺序产出 `(dodo_source_id, 结果)`，
+        结果为消息 ID 或发送失败的异常。
+        """
+        # checked here rather than in the generator so bad arguments fail
+        # at the call site instead of on the first iteration
+        if concurrency < 1:
+            raise ValueError(f"concurrency must be at least 1, got {concurrency}")
+        return self._broadcast_to_personals(
+            island_source_id, dodo_source_ids, message, concurrency, retries
+        )
+
+    async def _broadcast_to_personals(
+        self,
+        island_source_id: str,
+        dodo_source_ids: Union[Iterable[str], AsyncIterable[str]],
+        message: Union[str, Message, MessageSegment, PreparedMessage],
+        concurrency: int,
+        retries: int,
+    ) -> AsyncIterator[Tuple[str, Union[str, Exception]]]:
+        prepared = await self._prepare(message)
+
+        async def _send(dodo_source_id: str) -> Tuple[str, Union[str, Exception]]:
+            try:
+                return dodo_source_id, await self._send_with_retry(
+                    lambda: self.send_to_personal(
+                        island_source_id, dodo_source_id, prepared
+                    ),
+                    retries,
+                )
+            except Exception as e:
+                return dodo_source_id, e
+
+        async def _iter_targets() -> AsyncIterator[str]:
+            if isinstance(dodo_source_ids, AsyncIterable):
+                async for dodo_source_id in dodo_source_ids:
+                    yield dodo_source_id
+            else:
+                for dodo_source_id in dodo_source_ids:
+                    yield dodo_source_id
+
+        pending: Set["asyncio.Task[Tuple[str, Union[str, Exception]]]"] = set()
+        try:
+            async for dodo_source_id in _iter_targets():
+                if len(pending) >= concurrency:
+                    done, pending = await asyncio.wait(
+                        pending, return_when=asyncio.FIRST_COMPLETED
+                    )
+                    for task in done:
+                        yield task.result()
+                pending.add(asyncio.create_task(_send(dodo_source_id)))
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    yield task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
     def _handle_response(self, response: Response) -> Any:
         if response.content and (
-            result := type_validate_python(ApiReturn, json.loads(response.content))
+            result := self.adapter.codec.validate_json(ApiReturn, response.content)
         ):
             if result.status == 0:
                 return result.data
@@ -221,6 +580,34 @@ class Bot(BaseBot):
             }
         )
 
+        if self.rate_limiter is None:
+            return await self._send_request(request)
+
+        route = request.url.path
+        retries = self.adapter.dodo_config.rate_limit_retries
+        for attempt in range(retries + 1):
+            if attempt:
+                _rewind_files(request)
+            await self.rate_limiter.acquire(route)
+            try:
+                result = await self._send_request(request)
+            except RateLimitException:
+                self.rate_limiter.throttle(route)
+                if attempt >= retries:
+                    raise
+                log(
+                    "DEBUG",
+                    f"Bot {self.self_id} is rate limited on {route}, "
+                    f"retrying ({attempt + 1}/{retries})",
+                )
+            else:
+                self.rate_limiter.recover(route)
+                return result
+
+    async def _send_request(self, request: Request) -> Any:
+        if (metrics := self.adapter.metrics) is not None:
+            return await self._measure_request(request, metrics)
+
         try:
             response = await self.adapter.request(request)
         except Exception as e:
@@ -228,12 +615,117 @@ class Bot(BaseBot):
 
         return self._handle_response(response)
 
+    async def _measure_request(self, request: Request, metrics: AdapterMetrics) -> Any:
+        """发送请求并记录耗时、状态码与收发字节数"""
+        if request.json is not None:
+            # encode with the adapter codec here so the body size is known
+            request.content = self.adapter.codec.dumps(request.json).encode()
+            request.json = None
+            request.headers["Content-Type"] = "application/json"
+        bot, route = self.self_id, request.url.path
+        metrics.bytes.inc(
+            _request_size(request), bot=bot, transport="http", direction="out"
+        )
+
+        start = time.monotonic()
+        try:
+            response = await self.adapter.request(request)
+        except Exception as e:
+            metrics.api_latency.observe(time.monotonic() - start, bot=bot, route=route)
+            metrics.api_responses.inc(
+                bot=bot, route=route, http_status="", status="network_error"
+            )
+            raise NetworkError("API request error") from e
+        metrics.api_latency.observe(time.monotonic() - start, bot=bot, route=route)
+        content = response.content or b""
+        metrics.bytes.inc(
+            len(content.encode() if isinstance(content, str) else content),
+            bot=bot,
+            transport="http",
+            direction="in",
+        )
+
+        status = "0"
+        try:
+            return self._handle_response(response)
+        except ActionFailed as e:
+            status = str(e.status)
+            raise
+        except NetworkError:
+            status = "invalid_response"
+            raise
+        finally:
+            metrics.api_responses.inc(
+                bot=bot, route=route, http_status=response.status_code, status=status
+            )
+
+    def _message_request(
+        self,
+        path: str,
+        data: Dict[str, Any],
+        message_type: Optional[MessageType],
+        message_body: Union[MessageBody, PreparedMessage],
+    ) -> Request:
+        """构造消息发送请求，已序列化的消息体直接拼接到请求体中"""
+        if isinstance(message_body, PreparedMessage):
+            data["messageType"] = message_type or message_body.message_type
+            content = self.adapter.codec.dumps(exclude_none(data)).encode()
+            return Request(
+                "POST",
+                self.adapter.api_base / path,
+                headers={"Content-Type": "application/json"},
+                content=content[:-1] + b',"messageBody":' + message_body.body + b"}",
+            )
+        data["messageType"] = message_type or message_body.__type__
+        data["messageBody"] = model_dump(message_body, by_alias=True, exclude_none=True)
+        return Request("POST", self.adapter.api_base / path, json=exclude_none(data))
+
     async def handle_event(self, event: Event) -> None:
+        if self.api_cache is not None and isinstance(
+            event, (MemberJoinEvent, MemberLeaveEvent)
+        ):
+            for api in ("get_member_info", "get_member_role_list"):
+                self.api_cache.invalidate(
+                    api,
+                    island_source_id=event.island_source_id,
+                    dodo_source_id=event.dodo_source_id,
+                )
         if isinstance(event, ChannelMessageEvent):
             _check_at_me(self, event)
         await handle_event(self, event)
 
+    async def _paginate(
+        self,
+        api: Callable[..., Awaitable[ListResult[T]]],
+        page_size: int,
+        **params: Any,
+    ) -> AsyncIterator[T]:
+        """按 max_id 逐页拉取列表，处理当前页时预取下一页
+
+        服务端可能限制每页的数量，因此只在返回空页或 max_id 不再变化时停止。
+        """
+        max_id = 0
+        next_page: Optional["asyncio.Future[ListResult[T]]"] = asyncio.ensure_future(
+            api(page_size=page_size, max_id=max_id, **params)
+        )
+        try:
+            while next_page is not None:
+                result = await next_page
+                if result.list and result.max_id != max_id:
+                    max_id = result.max_id
+                    next_page = asyncio.ensure_future(
+                        api(page_size=page_size, max_id=max_id, **params)
+                    )
+                else:
+                    next_page = None
+                for item in result.list:
+                    yield item
+        finally:
+            if next_page is not None and not next_page.done():
+                next_page.cancel()
+
     @API
+    @coalesced
     async def get_bot_info(self) -> BotInfo:
         request = Request("POST", self.adapter.api_base / "bot/info")
         bot_info = type_validate_python(BotInfo, await self._request(request))
@@ -250,6 +742,7 @@ class Bot(BaseBot):
         await self._request(request)
 
     @API
+    @coalesced
     async def get_bot_invite_list(
         self, *, page_size: int, max_id: int = 0
     ) -> ListResult[BotInviteInfo]:
@@ -262,6 +755,11 @@ class Bot(BaseBot):
             ListResult[BotInviteInfo], await self._request(request)
         )
 
+    def iter_bot_invite_list(
+        self, *, page_size: int = 100
+    ) -> AsyncIterator[BotInviteInfo]:
+        return self._paginate(self.get_bot_invite_list, page_size)
+
     @API
     async def set_bot_invite_add(self, *, dodo_source_id: str) -> None:
         request = Request(
@@ -281,11 +779,14 @@ class Bot(BaseBot):
         await self._request(request)
 
     @API
+    @coalesced
     async def get_island_list(self) -> List[IslandInfo]:
         request = Request("POST", self.adapter.api_base / "island/list")
         return type_validate_python(List[IslandInfo], await self._request(request))
 
     @API
+    @cached
+    @coalesced
     async def get_island_info(self, *, island_source_id: str) -> IslandInfo:
         request = Request(
             "POST",
@@ -295,6 +796,7 @@ class Bot(BaseBot):
         return type_validate_python(IslandInfo, await self._request(request))
 
     @API
+    @coalesced
     async def get_island_level_rank_list(
         self, *, island_source_id: str
     ) -> List[IslandLevelRankInfo]:
@@ -308,6 +810,7 @@ class Bot(BaseBot):
         )
 
     @API
+    @coalesced
     async def get_island_mute_list(
         self, *, island_source_id: str, page_size: int, max_id: int = 0
     ) -> ListResult[IslandMuteOrBanData]:
@@ -324,7 +827,20 @@ class Bot(BaseBot):
             ListResult[IslandMuteOrBanData], await self._request(request)
         )
 
+    def iter_island_mute_list(
+        self,
+        *,
+        island_source_id: str,
+        page_size: int = 100,
+    ) -> AsyncIterator[IslandMuteOrBanData]:
+        return self._paginate(
+            self.get_island_mute_list,
+            page_size,
+            island_source_id=island_source_id,
+        )
+
     @API
+    @coalesced
     async def get_island_ban_list(
         self, *, island_source_id: str, page_size: int, max_id: int = 0
     ) -> ListResult[IslandMuteOrBanData]:
@@ -341,7 +857,21 @@ class Bot(BaseBot):
             ListResult[IslandMuteOrBanData], await self._request(request)
         )
 
+    def iter_island_ban_list(
+        self,
+        *,
+        island_source_id: str,
+        page_size: int = 100,
+    ) -> AsyncIterator[IslandMuteOrBanData]:
+        return self._paginate(
+            self.get_island_ban_list,
+            page_size,
+            island_source_id=island_source_id,
+        )
+
     @API
+    @cached
+    @coalesced
     async def get_channel_list(self, *, island_source_id: str) -> List[ChannelInfo]:
         request = Request(
             "POST",
@@ -351,6 +881,8 @@ class Bot(BaseBot):
         return type_validate_python(List[ChannelInfo], await self._request(request))
 
     @API
+    @cached
+    @coalesced
     async def get_channel_info(self, *, channel_id: str) -> ChannelInfo:
         request = Request(
             "POST",
@@ -360,6 +892,7 @@ class Bot(BaseBot):
         return type_validate_python(ChannelInfo, await self._request(request))
 
     @API
+    @invalidates("get_channel_list")
     async def set_channel_add(
         self,
         *,
@@ -381,6 +914,7 @@ class Bot(BaseBot):
         return type_validate_python(ChannelData, await self._request(request))
 
     @API
+    @invalidates("get_channel_list", "get_channel_info")
     async def set_channel_edit(
         self,
         *,
@@ -402,6 +936,7 @@ class Bot(BaseBot):
         await self._request(request)
 
     @API
+    @invalidates("get_channel_list", "get_channel_info")
     async def set_channel_remove(
         self,
         *,
@@ -420,25 +955,20 @@ class Bot(BaseBot):
         self,
         *,
         channel_id: str,
-        message_type: MessageType,
-        message_body: MessageBody,
+        message_body: Union[MessageBody, PreparedMessage],
+        message_type: Optional[MessageType] = None,
         referenced_message_id: Optional[str] = None,
         dodo_source_id: Optional[str] = None,
     ) -> MessageReturn:
-        request = Request(
-            "POST",
-            self.adapter.api_base / "channel/message/send",
-            json=exclude_none(
-                {
-                    "channelId": channel_id,
-                    "messageType": message_type,
-                    "messageBody": model_dump(
-                        message_body, by_alias=True, exclude_none=True
-                    ),
-                    "referencedMessageId": referenced_message_id,
-                    "dodoSourceId": dodo_source_id,
-                }
-            ),
+        request = self._message_request(
+            "channel/message/send",
+            {
+                "channelId": channel_id,
+                "referencedMessageId": referenced_message_id,
+                "dodoSourceId": dodo_source_id,
+            },
+            message_type,
+            message_body,
         )
         return type_validate_python(MessageReturn, await self._request(request))
 
@@ -481,6 +1011,7 @@ class Bot(BaseBot):
         await self._request(request)
 
     @API
+    @coalesced
     async def get_channel_message_reaction_list(
         self, *, message_id: str
     ) -> List[MessageReactionInfo]:
@@ -494,6 +1025,7 @@ class Bot(BaseBot):
         )
 
     @API
+    @coalesced
     async def get_channel_message_reaction_member_list(
         self, *, message_id: str, emoji: Emoji, page_size: int, max_id: int = 0
     ) -> ListResult[MessageReactionMemberInfo]:
@@ -511,6 +1043,20 @@ class Bot(BaseBot):
             ListResult[MessageReactionMemberInfo], await self._request(request)
         )
 
+    def iter_channel_message_reaction_member_list(
+        self,
+        *,
+        message_id: str,
+        emoji: Emoji,
+        page_size: int = 100,
+    ) -> AsyncIterator[MessageReactionMemberInfo]:
+        return self._paginate(
+            self.get_channel_message_reaction_member_list,
+            page_size,
+            message_id=message_id,
+            emoji=emoji,
+        )
+
     @API
     async def set_channel_message_reaction_add(
         self, *, message_id: str, emoji: Emoji
@@ -540,6 +1086,7 @@ class Bot(BaseBot):
         await self._request(request)
 
     @API
+    @coalesced
     async def get_channel_voice_member_status(
         self, *, island_source_id: str, dodo_source_id: str
     ) -> ChannelVoiceMemberStatusInfo:
@@ -624,6 +1171,8 @@ class Bot(BaseBot):
         await self._request(request)
 
     @API
+    @cached
+    @coalesced
     async def get_role_list(self, *, island_source_id: str) -> List[RoleInfo]:
         request = Request(
             "POST",
@@ -633,6 +1182,7 @@ class Bot(BaseBot):
         return type_validate_python(List[RoleInfo], await self._request(request))
 
     @API
+    @invalidates("get_role_list")
     async def set_role_add(
         self,
         *,
@@ -658,6 +1208,7 @@ class Bot(BaseBot):
         return type_validate_python(RoleData, await self._request(request))
 
     @API
+    @invalidates("get_role_list", "get_member_role_list")
     async def set_role_edit(
         self,
         *,
@@ -685,6 +1236,7 @@ class Bot(BaseBot):
         await self._request(request)
 
     @API
+    @invalidates("get_role_list", "get_member_role_list")
     async def set_role_remove(
         self,
         *,
@@ -702,6 +1254,7 @@ class Bot(BaseBot):
         await self._request(request)
 
     @API
+    @coalesced
     async def get_role_member_list(
         self, *, island_source_id: str, role_id: str, page_size: int, max_id: int = 0
     ) -> ListResult[RoleMemberInfo]:
@@ -719,7 +1272,22 @@ class Bot(BaseBot):
             ListResult[RoleMemberInfo], await self._request(request)
         )
 
+    def iter_role_member_list(
+        self,
+        *,
+        island_source_id: str,
+        role_id: str,
+        page_size: int = 100,
+    ) -> AsyncIterator[RoleMemberInfo]:
+        return self._paginate(
+            self.get_role_member_list,
+            page_size,
+            island_source_id=island_source_id,
+            role_id=role_id,
+        )
+
     @API
+    @invalidates("get_member_role_list")
     async def set_role_member_add(
         self,
         *,
@@ -739,6 +1307,7 @@ class Bot(BaseBot):
         await self._request(request)
 
     @API
+    @invalidates("get_member_role_list")
     async def set_role_member_remove(
         self,
         *,
@@ -758,6 +1327,7 @@ class Bot(BaseBot):
         await self._request(request)
 
     @API
+    @coalesced
     async def get_member_list(
         self, *, island_source_id: str, page_size: int, max_id: int = 0
     ) -> ListResult[MemberInfo]:
@@ -774,7 +1344,21 @@ class Bot(BaseBot):
             ListResult[MemberInfo], await self._request(request)
         )
 
+    def iter_member_list(
+        self,
+        *,
+        island_source_id: str,
+        page_size: int = 100,
+    ) -> AsyncIterator[MemberInfo]:
+        return self._paginate(
+            self.get_member_list,
+            page_size,
+            island_source_id=island_source_id,
+        )
+
     @API
+    @cached
+    @coalesced
     async def get_member_info(
         self,
         *,
@@ -792,6 +1376,8 @@ class Bot(BaseBot):
         return type_validate_python(MemberInfo, await self._request(request))
 
     @API
+    @cached
+    @coalesced
     async def get_member_role_list(
         self,
         *,
@@ -809,6 +1395,7 @@ class Bot(BaseBot):
         return type_validate_python(List[MemberRoleInfo], await self._request(request))
 
     @API
+    @coalesced
     async def get_member_invitation_info(
         self,
         *,
@@ -828,6 +1415,7 @@ class Bot(BaseBot):
         )
 
     @API
+    @coalesced
     async def get_member_dodo_id_map_list(
         self, *, dodo_id_list: List[str]
     ) -> List[DoDoIDMapData]:
@@ -839,6 +1427,7 @@ class Bot(BaseBot):
         return type_validate_python(List[DoDoIDMapData], await self._request(request))
 
     @API
+    @invalidates("get_member_info")
     async def set_member_nick_name_edit(
         self, *, island_source_id: str, dodo_source_id: str, nick_name: str
     ) -> None:
@@ -928,6 +1517,7 @@ class Bot(BaseBot):
         await self._request(request)
 
     @API
+    @coalesced
     async def get_gift_account(
         self,
         *,
@@ -941,6 +1531,7 @@ class Bot(BaseBot):
         return type_validate_python(GiftAccountInfo, await self._request(request))
 
     @API
+    @coalesced
     async def get_gift_share_ratio_info(
         self,
         *,
@@ -954,6 +1545,7 @@ class Bot(BaseBot):
         return type_validate_python(GiftShareRatioInfo, await self._request(request))
 
     @API
+    @coalesced
     async def get_gift_list(
         self, *, target_type: TargetType, target_id: str
     ) -> List[GiftInfo]:
@@ -965,6 +1557,7 @@ class Bot(BaseBot):
         return type_validate_python(List[GiftInfo], await self._request(request))
 
     @API
+    @coalesced
     async def get_gift_member_list(
         self,
         *,
@@ -989,7 +1582,24 @@ class Bot(BaseBot):
             ListResult[GiftMemberInfo], await self._request(request)
         )
 
+    def iter_gift_member_list(
+        self,
+        *,
+        target_type: TargetType,
+        target_id: str,
+        gift_id: str,
+        page_size: int = 100,
+    ) -> AsyncIterator[GiftMemberInfo]:
+        return self._paginate(
+            self.get_gift_member_list,
+            page_size,
+            target_type=target_type,
+            target_id=target_id,
+            gift_id=gift_id,
+        )
+
     @API
+    @coalesced
     async def get_gift_gross_value_list(
         self,
         *,
@@ -1012,7 +1622,22 @@ class Bot(BaseBot):
             ListResult[GiftGrossValueInfo], await self._request(request)
         )
 
+    def iter_gift_gross_value_list(
+        self,
+        *,
+        target_type: TargetType,
+        target_id: str,
+        page_size: int = 100,
+    ) -> AsyncIterator[GiftGrossValueInfo]:
+        return self._paginate(
+            self.get_gift_gross_value_list,
+            page_size,
+            target_type=target_type,
+            target_id=target_id,
+        )
+
     @API
+    @coalesced
     async def get_integral_info(
         self,
         *,
@@ -1056,37 +1681,62 @@ class Bot(BaseBot):
         *,
         island_source_id: str,
         dodo_source_id: str,
-        message_type: MessageType,
-        message_body: MessageBody,
+        message_body: Union[MessageBody, PreparedMessage],
+        message_type: Optional[MessageType] = None,
     ) -> MessageReturn:
-        request = Request(
-            "POST",
-            self.adapter.api_base / "personal/message/send",
-            json={
-                "islandSourceId": island_source_id,
-                "dodoSourceId": dodo_source_id,
-                "messageType": message_type,
-                "messageBody": model_dump(
-                    message_body, by_alias=True, exclude_none=True
-                ),
-            },
+        request = self._message_request(
+            "personal/message/send",
+            {"islandSourceId": island_source_id, "dodoSourceId": dodo_source_id},
+            message_type,
+            message_body,
         )
         return type_validate_python(MessageReturn, await self._request(request))
 
     @API
     async def set_resouce_picture_upload(
-        self, *, file: Union[bytes, BytesIO, Path], file_name: Optional[str] = None
+        self, *, file: PictureFile, file_name: Optional[str] = None
     ) -> PictureInfo:
-        if isinstance(file, Path):
-            file = file.read_bytes()
-        elif isinstance(file, BytesIO):
-            file = file.getvalue()
-        request = Request(
-            "POST",
-            self.adapter.api_base / "resource/picture/upload",
-            files={"file": (file_name or "image.png", file, "multipart/form-data")},
-        )
-        return type_validate_python(PictureInfo, await self._request(request))
+        if (cache := self.adapter.picture_cache) is None:
+            async with open_picture(file) as f:
+                return await self._upload_picture(f, file_name)
+
+        async with AsyncExitStack() as stack:
+            f = await stack.enter_async_context(open_picture(file))
+            key = await picture_hash(f)
+            if (info := cache.get(key)) is not None:
+                return info
+            # the shared upload may outlive this caller, so it takes over the file
+            info = await self.single_flight.do(
+                "set_resouce_picture_upload",
+                (("hash", key),),
+                lambda: self._upload_owned(stack.pop_all(), f, file_name),
+            )
+        cache.set(key, info)
+        return info
+
+    async def _upload_owned(
+        self,
+        files: AsyncExitStack,
+        file: Union[bytes, IO[bytes]],
+        file_name: Optional[str],
+    ) -> PictureInfo:
+        """上传并在结束后关闭文件"""
+        async with files:
+            return await self._upload_picture(file, file_name)
+
+    async def _upload_picture(
+        self, file: Union[bytes, IO[bytes]], file_name: Optional[str]
+    ) -> PictureInfo:
+        # decoding is bounded by the upload slots as well
+        async with self.upload_slots:
+            if self.picture_processor is not None:
+                file = await self.picture_processor.process(file)
+            request = Request(
+                "POST",
+                self.adapter.api_base / "resource/picture/upload",
+                files={"file": (file_name or "image.png", file, "multipart/form-data")},
+            )
+            return type_validate_python(PictureInfo, await self._request(request))
 
     @API
     async def get_websocket_connection(self) -> WebSocketConnectionData:
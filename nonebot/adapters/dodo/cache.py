@@ -0,0 +1,190 @@
+import asyncio
+from collections import OrderedDict
+from functools import wraps
+import time
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Generic,
+    Hashable,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+from typing_extensions import Concatenate, ParamSpec
+
+if TYPE_CHECKING:
+    from .bot import Bot
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+B = TypeVar("B", bound="Bot")
+R = TypeVar("R")
+P = ParamSpec("P")
+
+CacheKey = Tuple[Tuple[str, Any], ...]
+
+
+def make_key(params: Dict[str, Any]) -> CacheKey:
+    return tuple(sorted(params.items()))
+
+
+class TTLCache(Generic[K, V]):
+    """带过期时间的 LRU 缓存"""
+
+    def __init__(self, ttl: float, max_size: int) -> None:
+        self.ttl = ttl
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[K, Tuple[float, V]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: K) -> Optional[V]:
+        if (item := self._data.get(key)) is not None:
+            expire_at, value = item
+            if expire_at > time.monotonic():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._data[key]
+        self.misses += 1
+        return None
+
+    def set(self, key: K, value: V) -> None:
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def invalidate(self, predicate: Callable[[K], bool]) -> int:
+        keys = [key for key in self._data if predicate(key)]
+        for key in keys:
+            del self._data[key]
+        return len(keys)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+
+class ApiCache:
+    """只读 API 的结果缓存，按 API 名称分别设置过期时间"""
+
+    def __init__(self, ttls: Dict[str, float], max_size: int) -> None:
+        self.caches: Dict[str, TTLCache[CacheKey, Any]] = {
+            api: TTLCache(ttl, max_size) for api, ttl in ttls.items()
+        }
+
+    def get(self, api: str, key: CacheKey) -> Any:
+        if (cache := self.caches.get(api)) is not None:
+            return cache.get(key)
+
+    def set(self, api: str, key: CacheKey, value: Any) -> None:
+        if (cache := self.caches.get(api)) is not None:
+            cache.set(key, value)
+
+    def invalidate(self, api: str, **params: Any) -> None:
+        """清除与给定参数匹配的缓存，未给出的参数视为匹配任意值"""
+        if (cache := self.caches.get(api)) is None:
+            return
+        cache.invalidate(
+            lambda key: all(params.get(name, value) == value for name, value in key)
+        )
+
+    def clear(self) -> None:
+        for cache in self.caches.values():
+            cache.clear()
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """各 API 的缓存命中数、未命中数与当前条目数"""
+        return {
+            api: {"hits": cache.hits, "misses": cache.misses, "size": len(cache)}
+            for api, cache in self.caches.items()
+        }
+
+
+def cached(
+    func: Callable[Concatenate[B, P], Awaitable[R]],
+) -> Callable[Concatenate[B, P], Awaitable[R]]:
+    """按调用参数缓存 API 结果，未启用缓存时直接调用"""
+    api = func.__name__
+
+    @wraps(func)
+    async def wrapper(bot: B, *args: P.args, **kwargs: P.kwargs) -> R:
+        if bot.api_cache is None:
+            return await func(bot, *args, **kwargs)
+        key = make_key(kwargs)
+        if (result := bot.api_cache.get(api, key)) is not None:
+            return result
+        result = await func(bot, *args, **kwargs)
+        bot.api_cache.set(api, key, result)
+        return result
+
+    return wrapper
+
+
+class SingleFlight:
+    """合并相同参数的并发调用，只执行一次并共享结果"""
+
+    def __init__(self) -> None:
+        self.inflight: Dict[Tuple[str, CacheKey], "asyncio.Future[Any]"] = {}
+
+    async def do(self, api: str, key: CacheKey, call: Callable[[], Awaitable[R]]) -> R:
+        flight = (api, key)
+        if (future := self.inflight.get(flight)) is None:
+            future = self.inflight[flight] = asyncio.ensure_future(call())
+            future.add_done_callback(lambda f: self._done(flight, f))
+        return await asyncio.shield(future)
+
+    def _done(self, flight: Tuple[str, CacheKey], future: "asyncio.Future[Any]"):
+        self.inflight.pop(flight, None)
+        # mark the exception as retrieved in case every caller was cancelled
+        if not future.cancelled():
+            future.exception()
+
+
+def coalesced(
+    func: Callable[Concatenate[B, P], Awaitable[R]],
+) -> Callable[Concatenate[B, P], Awaitable[R]]:
+    """相同参数的并发调用共享同一次请求"""
+    api = func.__name__
+
+    @wraps(func)
+    async def wrapper(bot: B, *args: P.args, **kwargs: P.kwargs) -> R:
+        key = make_key(kwargs)
+        try:
+            hash(key)
+        except TypeError:
+            return await func(bot, *args, **kwargs)
+        return await bot.single_flight.do(api, key, lambda: func(bot, *args, **kwargs))
+
+    return wrapper
+
+
+def invalidates(
+    *apis: str,
+) -> Callable[
+    [Callable[Concatenate[B, P], Awaitable[R]]],
+    Callable[Concatenate[B, P], Awaitable[R]],
+]:
+    """修改类 API 调用成功后，清除参数匹配的相关只读 API 缓存"""
+
+    def decorator(
+        func: Callable[Concatenate[B, P], Awaitable[R]],
+    ) -> Callable[Concatenate[B, P], Awaitable[R]]:
+        @wraps(func)
+        async def wrapper(bot: B, *args: P.args, **kwargs: P.kwargs) -> R:
+            result = await func(bot, *args, **kwargs)
+            if bot.api_cache is not None:
+                for api in apis:
+                    bot.api_cache.invalidate(api, **kwargs)
+            return result
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,86 @@
+import json
+from typing import Any, ClassVar, Dict, Literal, Type, TypeVar, Union
+
+from nonebot.compat import PYDANTIC_V2
+
+from pydantic import BaseModel
+
+from .compat import model_validate, model_validate_json
+
+M = TypeVar("M", bound=BaseModel)
+
+CodecName = Literal["json", "orjson", "msgspec"]
+
+
+class JSONCodec:
+    """标准库 json 编解码"""
+
+    name: ClassVar[str] = "json"
+
+    def loads(self, data: Union[str, bytes]) -> Any:
+        return json.loads(data)
+
+    def dumps(self, obj: Any) -> str:
+        return json.dumps(obj)
+
+    def validate_json(self, model: Type[M], data: Union[str, bytes]) -> M:
+        """解析 JSON 并校验为模型
+
+        pydantic v2 下直接由 pydantic-core 从原始数据校验，不经过中间 dict。
+        """
+        if PYDANTIC_V2:
+            return model_validate_json(model, data)
+        return model_validate(model, self.loads(data))
+
+
+class ORJSONCodec(JSONCodec):
+    """orjson 编解码"""
+
+    name: ClassVar[str] = "orjson"
+
+    def __init__(self) -> None:
+        import orjson
+
+        self._loads = orjson.loads
+        self._dumps = orjson.dumps
+
+    def loads(self, data: Union[str, bytes]) -> Any:
+        return self._loads(data)
+
+    def dumps(self, obj: Any) -> str:
+        return self._dumps(obj).decode()
+
+
+class MsgspecCodec(JSONCodec):
+    """msgspec 编解码"""
+
+    name: ClassVar[str] = "msgspec"
+
+    def __init__(self) -> None:
+        import msgspec
+
+        self._decode = msgspec.json.decode
+        self._encode = msgspec.json.encode
+
+    def loads(self, data: Union[str, bytes]) -> Any:
+        return self._decode(data)
+
+    def dumps(self, obj: Any) -> str:
+        return self._encode(obj).decode()
+
+
+CODECS: Dict[str, Type[JSONCodec]] = {
+    codec.name: codec for codec in (JSONCodec, ORJSONCodec, MsgspecCodec)
+}
+
+
+def get_codec(name: str) -> JSONCodec:
+    if (codec := CODECS.get(name)) is None:
+        raise RuntimeError(f"Unknown json codec {name!r}")
+    try:
+        return codec()
+    except ImportError as e:
+        raise RuntimeError(
+            f"Json codec {name!r} is not available. "
+            f"Please install {name} first to use it."
+        ) from e
@@ -1,18 +1,46 @@
-from typing import Literal, overload
+from functools import partial
+from typing import Any, Callable, Dict, Literal, Type, TypeVar, Union, overload
 
 from nonebot.compat import PYDANTIC_V2
 
-__all__ = ("model_validator", "field_validator", "GenericModel")
+from pydantic import BaseModel
+
+__all__ = (
+    "model_validator",
+    "field_validator",
+    "model_validate",
+    "model_validate_json",
+    "model_copy",
+    "type_validator",
+    "GenericModel",
+)
+
+M = TypeVar("M", bound=BaseModel)
+T = TypeVar("T")
 
 if PYDANTIC_V2:
     from pydantic import (
         BaseModel as GenericModel,
+        TypeAdapter,
         field_validator as field_validator,
         model_validator as model_validator,
     )
 
+    def model_validate(model: Type[M], data: Any) -> M:
+        return model.model_validate(data)
+
+    def model_validate_json(model: Type[M], data: Union[str, bytes]) -> M:
+        return model.model_validate_json(data)
+
+    def model_copy(model: M, update: Dict[str, Any]) -> M:
+        return model.model_copy(update=update)
+
+    def type_validator(type_: Type[T]) -> Callable[[Any], T]:
+        """预先构建指定类型的校验函数"""
+        return TypeAdapter(type_).validate_python
+
 else:
-    from pydantic import root_validator, validator
+    from pydantic import parse_obj_as, root_validator, validator
     from pydantic.generics import GenericModel as GenericModel
 
     @overload
@@ -26,3 +54,16 @@ else:
 
     def field_validator(__field, *fields, mode: Literal["before", "after"] = "after"):
         return validator(__field, *fields, pre=mode == "before", allow_reuse=True)
+
+    def model_validate(model: Type[M], data: Any) -> M:
+        return model.parse_obj(data)
+
+    def model_validate_json(model: Type[M], data: Union[str, bytes]) -> M:
+        return model.parse_raw(data)
+
+    def model_copy(model: M, update: Dict[str, Any]) -> M:
+        return model.copy(update=update)
+
+    def type_validator(type_: Type[T]) -> Callable[[Any], T]:
+        """预先构建指定类型的校验函数"""
+        return partial(parse_obj_as, type_)
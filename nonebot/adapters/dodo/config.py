@@ -1,7 +1,12 @@
-from typing import List
+from pathlib import Path
+from typing import Dict, List, Optional, Set
 
 from pydantic import BaseModel, Field
 
+from .codec import CodecName
+from .dispatcher import OverflowPolicy
+from .event import EventType
+
 
 class BotConfig(BaseModel):
     client_id: str
@@ -10,3 +15,91 @@ class BotConfig(BaseModel):
 
 class Config(BaseModel):
     bots: List[BotConfig] = Field(default_factory=list, alias="dodo_bots")
+    json_codec: CodecName = Field(default="json", alias="dodo_json_codec")
+    shards: int = Field(default=1, ge=1, alias="dodo_shards")
+    shard_id: Optional[int] = Field(default=None, ge=0, alias="dodo_shard_id")
+    shard_report_port: Optional[int] = Field(
+        default=None, alias="dodo_shard_report_port"
+    )
+    shard_report_interval: float = Field(
+        default=10.0, gt=0, alias="dodo_shard_report_interval"
+    )
+    dispatch_queue_size: int = Field(
+        default=1000, ge=0, alias="dodo_dispatch_queue_size"
+    )
+    dispatch_workers: int = Field(default=32, ge=0, alias="dodo_dispatch_workers")
+    dispatch_overflow: OverflowPolicy = Field(
+        default="block", alias="dodo_dispatch_overflow"
+    )
+    dispatch_drop_event_types: Set[EventType] = Field(
+        default_factory=set, alias="dodo_dispatch_drop_event_types"
+    )
+    dispatch_ordered: bool = Field(default=False, alias="dodo_dispatch_ordered")
+    startup_concurrency: int = Field(default=5, ge=1, alias="dodo_startup_concurrency")
+    startup_interval: float = Field(default=0.5, ge=0, alias="dodo_startup_interval")
+    startup_retries: int = Field(default=3, ge=0, alias="dodo_startup_retries")
+    reconnect_initial_delay: float = Field(
+        default=1.0, gt=0, alias="dodo_reconnect_initial_delay"
+    )
+    reconnect_max_delay: float = Field(
+        default=60.0, gt=0, alias="dodo_reconnect_max_delay"
+    )
+    reconnect_stable_after: float = Field(
+        default=60.0, ge=0, alias="dodo_reconnect_stable_after"
+    )
+    heartbeat_interval: float = Field(
+        default=25.0, gt=0, alias="dodo_heartbeat_interval"
+    )
+    heartbeat_min_timeout: float = Field(
+        default=5.0, gt=0, alias="dodo_heartbeat_min_timeout"
+    )
+    heartbeat_max_missed: int = Field(
+        default=2, ge=1, alias="dodo_heartbeat_max_missed"
+    )
+    lazy_event: bool = Field(default=False, alias="dodo_lazy_event")
+    event_dedup_window: float = Field(default=60.0, alias="dodo_event_dedup_window")
+    event_dedup_size: int = Field(default=100000, ge=1, alias="dodo_event_dedup_size")
+    rate_limit: bool = Field(default=False, alias="dodo_rate_limit")
+    rate_limit_bot_rate: float = Field(
+        default=20.0, gt=0, alias="dodo_rate_limit_bot_rate"
+    )
+    rate_limit_route_rate: float = Field(
+        default=5.0, gt=0, alias="dodo_rate_limit_route_rate"
+    )
+    rate_limit_pause: float = Field(default=1.0, ge=0, alias="dodo_rate_limit_pause")
+    rate_limit_retries: int = Field(default=3, ge=0, alias="dodo_rate_limit_retries")
+    api_cache: bool = Field(default=False, alias="dodo_api_cache")
+    api_cache_size: int = Field(default=1024, ge=1, alias="dodo_api_cache_size")
+    api_cache_ttl: Dict[str, float] = Field(
+        default_factory=lambda: {
+            "get_island_info": 300.0,
+            "get_channel_list": 300.0,
+            "get_channel_info": 300.0,
+            "get_role_list": 300.0,
+            "get_member_info": 60.0,
+            "get_member_role_list": 60.0,
+        },
+        alias="dodo_api_cache_ttl",
+    )
+    upload_concurrency: int = Field(default=4, ge=1, alias="dodo_upload_concurrency")
+    picture_cache: bool = Field(default=False, alias="dodo_picture_cache")
+    picture_cache_path: Optional[Path] = Field(
+        default=None, alias="dodo_picture_cache_path"
+    )
+    picture_cache_size: int = Field(
+        default=10000, ge=1, alias="dodo_picture_cache_size"
+    )
+    picture_cache_ttl: float = Field(
+        default=7 * 24 * 3600, gt=0, alias="dodo_picture_cache_ttl"
+    )
+    picture_max_dimension: Optional[int] = Field(
+        default=None, ge=1, alias="dodo_picture_max_dimension"
+    )
+    picture_max_bytes: Optional[int] = Field(
+        default=None, ge=1, alias="dodo_picture_max_bytes"
+    )
+    picture_quality: int = Field(default=85, ge=1, le=100, alias="dodo_picture_quality")
+    metrics: bool = Field(default=False, alias="dodo_metrics")
+    metrics_path: Optional[str] = Field(
+        default="/dodo/metrics", alias="dodo_metrics_path"
+    )
@@ -0,0 +1,150 @@
+import asyncio
+from contextlib import contextmanager
+import random
+import time
+from typing import Iterator, Optional
+
+
+class Backoff:
+    """带随机抖动的指数退避
+
+    第 n 次重试等待 `[base / 2, base]` 之间的随机时长，
+    其中 `base = min(initial * 2^n, maximum)`，避免大量连接断开后同时重连。
+    """
+
+    def __init__(self, initial: float, maximum: float) -> None:
+        self.initial = initial
+        self.maximum = maximum
+        self.attempts = 0
+
+    def next(self) -> float:
+        base = min(self.initial * 2**self.attempts, self.maximum)
+        self.attempts += 1
+        return random.uniform(base / 2, base)
+
+    def reset(self) -> None:
+        self.attempts = 0
+
+
+class HeartbeatStats:
+    """心跳往返时延与丢失统计
+
+    接收任务被分发队列阻塞时无法读取心跳回复，此期间的心跳既不计入丢失，
+    也不计入往返时延。
+    """
+
+    def __init__(self, alpha: float = 0.2) -> None:
+        self.alpha = alpha
+        self.last_rtt: Optional[float] = None
+        self.ewma_rtt: Optional[float] = None
+        """往返时延的指数加权移动平均"""
+        self.max_rtt = 0.0
+        self.missed = 0
+        """未按时收到回复的心跳总数"""
+        self.consecutive_missed = 0
+        self._sent_at: Optional[float] = None
+        self._replied = asyncio.Event()
+        self._suspended = 0
+        self._stalled = False
+        """本次心跳期间接收任务是否被阻塞过"""
+
+    def timeout(self, minimum: float, maximum: float) -> float:
+        """等待回复的时长，按平均往返时延自适应"""
+        if self.ewma_rtt is None:
+            return maximum
+        return min(max(self.ewma_rtt * 4, minimum), maximum)
+
+    @contextmanager
+    def suspend(self) -> Iterator[None]:
+        """接收任务暂停读取期间暂停心跳检测"""
+        self._suspended += 1
+        self._stalled = True
+        try:
+            yield
+        finally:
+            self._suspended -= 1
+
+    def on_send(self) -> None:
+        # a reply to a stalled beat may still arrive and would be taken for this one
+        self._stalled = self._suspended > 0 or (
+            self._stalled and self._sent_at is not None
+        )
+        self._sent_at = time.monotonic()
+        self._replied.clear()
+
+    def on_reply(self) -> None:
+        if self._sent_at is None:
+            return
+        rtt, self._sent_at = time.monotonic() - self._sent_at, None
+        self.consecutive_missed = 0
+        self._replied.set()
+        if self._stalled:
+            return
+        self.last_rtt = rtt
+        self.ewma_rtt = (
+            rtt
+            if self.ewma_rtt is None
+            else self.alpha * rtt + (1 - self.alpha) * self.ewma_rtt
+        )
+        self.max_rtt = max(self.max_rtt, rtt)
+
+    async def wait_reply(self, timeout: float) -> bool:
+        """等待本次心跳的回复，超时且期间接收任务未被阻塞时记为丢失"""
+        try:
+            await asyncio.wait_for(self._replied.wait(), timeout)
+        except asyncio.TimeoutError:
+            if self._stalled:
+                return True
+            self.missed += 1
+            self.consecutive_missed += 1
+            return False
+        return True
+
+    def reset(self) -> None:
+        """新连接开始时清除未完成的心跳"""
+        self._sent_at = None
+        self.consecutive_missed = 0
+
+
+class ConnectionState:
+    """WebSocket 连接状态统计"""
+
+    def __init__(self) -> None:
+        self.connected_at: Optional[float] = None
+        """当前连接建立的时间，未连接时为 `None`"""
+        self.disconnected_at: Optional[float] = None
+        self.reconnects = 0
+        """断开后重新连接成功的次数"""
+        self.last_outage = 0.0
+        """最近一次断线的时长"""
+        self.total_outage = 0.0
+        self.ready = asyncio.Event()
+        """首次连接成功后设置"""
+        self.heartbeat = HeartbeatStats()
+
+    @property
+    def connected(self) -> bool:
+        return self.connected_at is not None
+
+    def on_connect(self) -> None:
+        now = time.monotonic()
+        if self.disconnected_at is not None:
+            self.reconnects += 1
+            self.last_outage = now - self.disconnected_at
+            self.total_outage += self.last_outage
+            self.disconnected_at = None
+        self.connected_at = now
+        self.heartbeat.reset()
+        self.ready.set()
+
+    def on_disconnect(self) -> float:
+        """记录断开连接，返回本次连接持续的时长
+
+        未连接成功的尝试不改变断线时间，首次连接前的失败不会被记为断线。
+        """
+        if self.connected_at is None:
+            return 0.0
+        now = time.monotonic()
+        duration, self.connected_at = now - self.connected_at, None
+        self.disconnected_at = now
+        return duration
@@ -0,0 +1,227 @@
+import asyncio
+from collections import OrderedDict, deque
+import time
+from typing import (
+    TYPE_CHECKING,
+    Counter,
+    Deque,
+    Dict,
+    Iterable,
+    List,
+    Literal,
+    Optional,
+    Set,
+    Tuple,
+)
+
+from .event import Event, EventType, PersonalMessageEvent
+from .utils import log
+
+if TYPE_CHECKING:
+    from .bot import Bot
+
+OverflowPolicy = Literal["block", "drop_oldest", "drop_event_type"]
+
+
+class EventDeduplicator:
+    """按 event_id 对一段时间窗口内的事件去重
+
+    记录按接收时间排序，过期记录从头部淘汰，超过 `max_size` 时淘汰最早的记录。
+    """
+
+    def __init__(self, window: float, max_size: int) -> None:
+        self.window = window
+        self.max_size = max_size
+        self.duplicates = 0
+        self._seen: "OrderedDict[str, float]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+    def is_duplicate(self, event_id: str) -> bool:
+        now = time.monotonic()
+        seen = self._seen
+        while seen:
+            oldest_id, received_at = next(iter(seen.items()))
+            if now - received_at <= self.window:
+                break
+            del seen[oldest_id]
+        if event_id in seen:
+            self.duplicates += 1
+            return True
+        seen[event_id] = now
+        if len(seen) > self.max_size:
+            seen.popitem(last=False)
+        return False
+
+
+class EventDispatcher:
+    """事件分发队列
+
+    接收任务只负责入队，由固定数量的 worker 处理事件，队列满时按 `overflow` 策略处理：
+
+    - `block`: 阻塞接收任务直到队列有空位
+    - `drop_oldest`: 丢弃队列中最早的事件
+    - `drop_event_type`: 丢弃 `drop_event_types` 中类型的新事件，其余类型阻塞
+
+    `workers` 为 0 时不限制同时处理的事件数，每个事件在单独的任务中处理，
+    队列只限制尚未开始处理的事件；否则处理中的事件同样占用队列空位，
+    全部 worker 都在等待后续事件的处理器中时，后续事件无法被处理。
+
+    `ordered` 开启时，同一频道（私信为同一用户）的事件按接收顺序依次处理，
+    不同频道之间仍然并行。处理器在处理中等待同一频道的后续事件时会一直阻塞到超时，
+    因此默认关闭。
+    """
+
+    def __init__(
+        self,
+        bot: "Bot",
+        *,
+        max_size: int,
+        workers: int,
+        overflow: OverflowPolicy = "block",
+        drop_event_types: Iterable[EventType] = (),
+        ordered: bool = False,
+    ) -> None:
+        self.bot = bot
+        self.max_size = max_size
+        self.workers = workers
+        self.overflow: OverflowPolicy = overflow
+        self.drop_event_types = set(drop_event_types)
+        self.ordered = ordered
+        self.queue: "asyncio.Queue[Tuple[float, Event]]" = asyncio.Queue()
+        """等待处理的事件与入队时间"""
+        self.dropped: Counter[EventType] = Counter()
+        """按事件类型统计的丢弃数"""
+        self._slots: Optional[asyncio.Semaphore] = (
+            asyncio.Semaphore(max_size) if max_size > 0 else None
+        )
+        self._shards: Dict[str, Deque[Tuple[float, Event]]] = {}
+        """正在处理中的分片，值为等待处理的同分片事件"""
+        self._tasks: List["asyncio.Task"] = []
+        self._running: Set["asyncio.Task"] = set()
+        """`workers` 为 0 时正在处理事件的任务"""
+
+    def qsize(self) -> int:
+        """当前排队的事件数"""
+        return self.queue.qsize() + sum(len(shard) for shard in self._shards.values())
+
+    @property
+    def shard_count(self) -> int:
+        """正在处理中的分片数"""
+        return len(self._shards)
+
+    @property
+    def total_dropped(self) -> int:
+        return sum(self.dropped.values())
+
+    def full(self) -> bool:
+        return self._slots is not None and self._slots.locked()
+
+    def start(self) -> List["asyncio.Task"]:
+        if self.workers > 0:
+            self._tasks = [
+                asyncio.create_task(self._worker()) for _ in range(self.workers)
+            ]
+        else:
+            self._tasks = [asyncio.create_task(self._spawner())]
+        return self._tasks
+
+    async def put(self, event: Event) -> None:
+        if self.full():
+            if self.overflow == "drop_oldest":
+                self._drop_oldest()
+            elif (
+                self.overflow == "drop_event_type"
+                and event.event_type in self.drop_event_types
+            ):
+                self._drop(event)
+                return
+        if self._slots is not None:
+            await self._slots.acquire()
+        self.queue.put_nowait((time.monotonic(), event))
+
+    def _shard_key(self, event: Event) -> Optional[str]:
+        if not self.ordered:
+            return None
+        if isinstance(event, PersonalMessageEvent):
+            return f"personal_{event.dodo_source_id}"
+        if channel_id := getattr(event, "channel_id", None):
+            return f"channel_{channel_id}"
+        return None
+
+    def _drop_oldest(self) -> None:
+        if not self.queue.empty():
+            self._drop(self.queue.get_nowait()[1])
+            return
+        for shard in self._shards.values():
+            if shard:
+                self._drop(shard.popleft()[1])
+                return
+
+    def _drop(self, event: Event) -> None:
+        self.dropped[event.event_type] += 1
+        log(
+            "DEBUG",
+            f"Event queue of bot {self.bot.self_id} is full, "
+            f"dropped event {event.event_id}",
+        )
+        self._release()
+
+    def _release(self) -> None:
+        if self._slots is not None:
+            self._slots.release()
+
+    async def _worker(self) -> None:
+        while True:
+            await self._dispatch(await self.queue.get())
+
+    async def _spawner(self) -> None:
+        while True:
+            task = asyncio.create_task(self._dispatch(await self.queue.get()))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _dispatch(self, item: Tuple[float, Event]) -> None:
+        key = self._shard_key(item[1])
+        if key is None:
+            await self._handle(*item)
+            return
+        if (shard := self._shards.get(key)) is not None:
+            shard.append(item)
+            return
+        self._shards[key] = shard = deque()
+        try:
+            await self._handle(*item)
+            while shard:
+                await self._handle(*shard.popleft())
+        finally:
+            del self._shards[key]
+
+    async def _handle(self, enqueued_at: float, event: Event) -> None:
+        if not self.workers:
+            # handlers are unbounded, so the slot only covers the waiting time
+            self._release()
+        metrics = self.bot.adapter.metrics
+        if metrics is not None:
+            metrics.dispatch_latency.observe(
+                time.monotonic() - enqueued_at, bot=self.bot.self_id
+            )
+        try:
+            await self.bot.handle_event(event)
+        except Exception as e:
+            if metrics is not None:
+                metrics.events_failed.inc(
+                    bot=self.bot.self_id,
+                    event_type=event.event_type.value,
+                    stage="handle",
+                )
+            log(
+                "ERROR",
+                "<r><bg #f8bbd0>Error while handling event "
+                f"{event.event_id}</bg #f8bbd0></r>",
+                e,
+            )
+        finally:
+            if self.workers:
+                self._release()
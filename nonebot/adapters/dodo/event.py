@@ -1,15 +1,36 @@
 from datetime import datetime
 from enum import Enum
-from typing import Any, Dict, List, Literal, Optional, Union
+from inspect import isclass
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    FrozenSet,
+    List,
+    Literal,
+    Optional,
+    Tuple,
+    Type,
+    TypeVar,
+    Union,
+    get_args,
+)
 from typing_extensions import override
 
 from nonebot.adapters import Event as BaseEvent
-from nonebot.compat import PYDANTIC_V2, ConfigDict, model_dump
+from nonebot.compat import (
+    PYDANTIC_V2,
+    ConfigDict,
+    ModelField,
+    PydanticUndefined,
+    model_dump,
+    model_fields,
+)
 from nonebot.utils import escape_tag
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
 
-from .compat import field_validator
+from .compat import field_validator, model_validate, type_validator
 from .message import Message
 from .models import (
     Emoji,
@@ -140,7 +161,8 @@ class MessageEvent(Event):
 
     @property
     def original_message(self) -> Message:
-        return getattr(self, "_original_message", self.get_message())
+        self.get_message()
+        return getattr(self, "_original_message")
 
     @property
     def reply(self) -> Optional[Reference]:
@@ -153,18 +175,17 @@ class MessageEvent(Event):
     @override
     def get_message(self) -> Message:
         if not hasattr(self, "_message"):
-            setattr(
-                self,
-                "_message",
-                Message.from_message_body(
-                    self.message_body, getattr(self, "reference", None)
-                ),
+            original_message = Message.from_message_body(
+                self.message_body, getattr(self, "reference", None)
             )
+            setattr(self, "_original_message", original_message)
+            # only segment data is modified in place (e.g. by _check_at_me),
+            # so copying the data dicts is enough to keep the original intact
             setattr(
                 self,
-                "_original_message",
-                Message.from_message_body(
-                    self.message_body, getattr(self, "reference", None)
+                "_message",
+                Message(
+                    type(seg)(seg.type, seg.data.copy()) for seg in original_message
                 ),
             )
         return getattr(self, "_message")
@@ -380,6 +401,133 @@ class EventSubject(BaseModel):
         return v
 
 
+EVENT_CLASSES: Dict[str, Type[Event]] = {
+    get_args(model.__annotations__["event_type"])[0].value: model
+    for model in get_args(EventClass)
+}
+"""eventType 到事件类的映射"""
+
+E = TypeVar("E", bound=Event)
+
+
+class LazyField:
+    """惰性字段，首次访问时才将原始数据校验为模型并写回
+
+    已校验的字段名记录在实例的 `_materialized` 中，不依据值的类型判断。
+    """
+
+    def __init__(self, name: str, validator: Callable[[Any], Any]) -> None:
+        self.name = name
+        self.validator = validator
+
+    def __get__(self, obj: Optional[Event], objtype: Optional[type] = None) -> Any:
+        if obj is None:
+            return self
+        value = obj.__dict__.get(self.name)
+        materialized: FrozenSet[str] = obj._materialized  # type: ignore
+        if self.name not in materialized:
+            value = obj.__dict__[self.name] = self.validator(value)
+            obj._materialized = materialized | {self.name}  # type: ignore
+        return value
+
+    def __set__(self, obj: Event, value: Any) -> None:
+        obj.__dict__[self.name] = value
+        obj._materialized = obj._materialized | {self.name}  # type: ignore
+
+
+def _has_model(annotation: Any) -> bool:
+    if isclass(annotation) and issubclass(annotation, BaseModel):
+        return True
+    return any(_has_model(arg) for arg in get_args(annotation))
+
+
+def _lazy_default(field: ModelField) -> Any:
+    # pydantic v1 treats `Any` without a default as optional
+    info = field.field_info
+    if info.default is PydanticUndefined and info.default_factory is None:
+        return Field(...)
+    return info
+
+
+def _lazy_event_class(model: Type[E]) -> Type[E]:
+    """生成事件类的惰性版本，嵌套模型字段保留原始数据，在首次访问时才校验"""
+    fields = {
+        field.name: field
+        for field in model_fields(model)
+        if _has_model(field.annotation)
+    }
+    lazy_fields: Tuple[str, ...] = tuple(fields)
+
+    def materialize(self: Event) -> None:
+        for name in lazy_fields:
+            getattr(self, name)
+
+    def get_event_description(self: Event) -> str:
+        # nonebot logs every event before matching, so unvisited lazy fields
+        # are shown as raw data instead of being validated here
+        return escape_tag(str(dump(self)))
+
+    def materialized(dump: Callable[..., Any]) -> Callable[..., Any]:
+        def wrapper(self: Event, *args: Any, **kwargs: Any) -> Any:
+            materialize(self)
+            return dump(self, *args, **kwargs)
+
+        return wrapper
+
+    if PYDANTIC_V2:
+        dump = model.model_dump
+        dumpers = {
+            "model_dump": materialized(model.model_dump),
+            "model_dump_json": materialized(model.model_dump_json),
+        }
+    else:
+        dump = model.dict
+        dumpers = {
+            "dict": materialized(model.dict),
+            "json": materialized(model.json),
+        }
+
+    lazy_model = type(model)(
+        model.__name__,
+        (model,),
+        {
+            "__module__": model.__module__,
+            "__qualname__": model.__qualname__,
+            "__annotations__": {name: Any for name in fields},
+            **{name: _lazy_default(field) for name, field in fields.items()},
+            "_materialized": PrivateAttr(frozenset()),
+            "get_event_description": get_event_description,
+            **dumpers,
+        },
+    )
+    for name, field in fields.items():
+        setattr(lazy_model, name, LazyField(name, type_validator(field.annotation)))
+    return lazy_model
+
+
+LAZY_EVENT_CLASSES: Dict[str, Type[Event]] = {
+    event_type: _lazy_event_class(model) for event_type, model in EVENT_CLASSES.items()
+}
+"""eventType 到惰性事件类的映射"""
+
+
+def parse_event(data: Dict[str, Any], lazy: bool = False) -> Event:
+    """根据 eventType 直接选择事件类进行解析
+
+    跳过 `EventClass` 联合类型的逐一匹配，将事件头字段与 `eventBody` 合并后解析，
+    不修改传入的数据。
+    `lazy` 为 `True` 时使用惰性事件类，嵌套模型字段在首次访问时才校验。
+    """
+    event_type = data.get("eventType")
+    classes = LAZY_EVENT_CLASSES if lazy else EVENT_CLASSES
+    if (model := classes.get(event_type)) is None:  # type: ignore
+        raise ValueError(f"Unknown event type: {event_type}")
+    # keep the payload intact so it can still be logged when validation fails
+    body = {key: value for key, value in data.items() if key != "eventBody"}
+    body.update(data["eventBody"])
+    return model_validate(model, body)
+
+
 __all__ = [
     "Event",
     "EventType",
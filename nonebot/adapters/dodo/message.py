@@ -1,8 +1,11 @@
 from dataclasses import dataclass
+from functools import lru_cache
 import re
 from typing import (
     TYPE_CHECKING,
+    Dict,
     Iterable,
+    List,
     Literal,
     Optional,
     Sequence,
@@ -11,7 +14,7 @@ from typing import (
     TypedDict,
     Union,
 )
-from typing_extensions import Self, override
+from typing_extensions import NotRequired, Self, override
 
 from nonebot.adapters import (
     Message as BaseMessage,
@@ -20,11 +23,14 @@ from nonebot.adapters import (
 
 from .models import (
     Card,
+    CardImage,
+    CardImageGroup,
     CardMessage,
     CardTheme,
     Component,
     FileMessage,
     MessageBody,
+    MessageType,
     PictureMessage,
     RedPacketMessage,
     Reference,
@@ -32,6 +38,7 @@ from .models import (
     TextMessage,
     VideoMessage,
 )
+from .picture import PictureFile
 
 
 class MessageSegment(BaseMessageSegment["Message"]):
@@ -69,7 +76,29 @@ class MessageSegment(BaseMessageSegment["Message"]):
         return ReferenceSegment("reference", {"message_id": message_id})
 
     @staticmethod
-    def picture(url: str, width: int, height: int, is_original: Optional[bool] = None):
+    def picture(
+        url: Optional[str] = None,
+        width: Optional[int] = None,
+        height: Optional[int] = None,
+        is_original: Optional[bool] = None,
+        *,
+        file: Optional[PictureFile] = None,
+    ):
+        """图片
+
+        传入 `file` 时为本地图片，发送时自动上传；
+        未指定 `width` 与 `height` 时，发送前从图片文件头读取宽高。
+        """
+        if file is not None:
+            return PictureSegment(
+                "picture", {"picture": None, "file": file, "is_original": is_original}
+            )
+        if url is None:
+            raise ValueError("url or file is required")
+        if width is None or height is None:
+            return PictureSegment(
+                "picture", {"picture": None, "url": url, "is_original": is_original}
+            )
         return PictureSegment(
             "picture",
             {
@@ -248,7 +277,10 @@ class ReferenceSegment(MessageSegment):
 
 
 class _PictureData(TypedDict):
-    picture: PictureMessage
+    picture: Optional[PictureMessage]
+    file: NotRequired[PictureFile]
+    url: NotRequired[str]
+    is_original: NotRequired[Optional[bool]]
 
 
 @dataclass
@@ -259,11 +291,18 @@ class PictureSegment(MessageSegment):
 
     @override
     def __str__(self) -> str:
-        return f"<picture:{self.message_body.url}>"
+        if (picture := self.data["picture"]) is None:
+            return f"<picture:{self.data.get('url', 'file')}>"
+        return f"<picture:{picture.url}>"
 
     @property
     def message_body(self) -> PictureMessage:
-        return self.data["picture"]
+        if (picture := self.data["picture"]) is None:
+            raise ValueError(
+                "Picture must be uploaded or sized first, "
+                "send it with send_* or resolve it with Bot.upload_pictures"
+            )
+        return picture
 
 
 class _VideoData(TypedDict):
@@ -388,28 +427,8 @@ class Message(BaseMessage[MessageSegment]):
     @staticmethod
     @override
     def _construct(msg: str) -> Iterable[MessageSegment]:
-        text_begin = 0
-        for embed in re.finditer(
-            r"\<(?P<type>(?:@!|@&|@|#))(?P<id>\w+?)\>",
-            msg,
-        ):
-            content = msg[text_begin : embed.pos + embed.start()]
-            if content:
-                yield TextSegment("text", {"text": content})
-            text_begin = embed.pos + embed.end()
-            if embed["type"] == "@!":
-                yield AtUserSegment("at_user", {"dodo_id": embed["id"]})
-            elif embed["type"] == "@&":
-                yield AtRoleSegment("at_role", {"role_id": embed["id"]})
-            elif embed["type"] == "#":
-                yield ChannelLinkSegment("channel_link", {"channel_id": embed["id"]})
-            elif embed["type"] == "@" and embed["id"] == "all":
-                yield AtAllSegment("at_all", {})
-            else:
-                yield TextSegment("text", {"text": f"<{embed['type']}{embed['id']}>"})
-        content = msg[text_begin:]
-        if content:
-            yield TextSegment("text", {"text": content})
+        for segment_class, type_, data in _tokenize(msg):
+            yield segment_class(type_, dict(data))
 
     @classmethod
     def from_message_body(
@@ -491,6 +510,23 @@ class Message(BaseMessage[MessageSegment]):
             ), message_id
         return TextMessage(content=msg.extract_text_content()), message_id
 
+    def local_pictures(self) -> List[Union[PictureSegment, CardImage]]:
+        """尚未上传的本地图片，包括卡片中的图片"""
+        pictures: List[Union[PictureSegment, CardImage]] = []
+        for seg in self:
+            if isinstance(seg, PictureSegment) and "file" in seg.data:
+                pictures.append(seg)
+            elif isinstance(seg, CardSegment):
+                for component in seg.message_body.card.components:
+                    if isinstance(component, CardImage):
+                        images = [component]
+                    elif isinstance(component, CardImageGroup):
+                        images = component.elements
+                    else:
+                        continue
+                    pictures.extend(image for image in images if image.file is not None)
+        return pictures
+
     def extract_text_content(self) -> str:
         return "".join(
             str(seg)
@@ -506,3 +542,53 @@ class Message(BaseMessage[MessageSegment]):
                 ),
             )
         )
+
+
+@dataclass(frozen=True)
+class PreparedMessage:
+    """预先序列化的消息
+
+    由 `Bot.prepare_message` 创建，向多个频道或用户发送同一条消息时只序列化一次。
+    """
+
+    message_type: MessageType
+    body: bytes
+    """序列化后的 messageBody"""
+    referenced_message_id: Optional[str] = None
+
+
+_EMBED_PATTERN = re.compile(
+    r"<(?:@!(?P<at_user>\w+)|@&(?P<at_role>\w+)|#(?P<channel_link>\w+)"
+    r"|@(?P<at_all>all))>"
+)
+_EMBED_SEGMENTS: Dict[str, Tuple[Type[MessageSegment], str]] = {
+    "at_user": (AtUserSegment, "dodo_id"),
+    "at_role": (AtRoleSegment, "role_id"),
+    "channel_link": (ChannelLinkSegment, "channel_id"),
+}
+
+_Token = Tuple[Type[MessageSegment], str, Tuple[Tuple[str, str], ...]]
+
+
+@lru_cache(maxsize=1024)
+def _tokenize(msg: str) -> Tuple[_Token, ...]:
+    """将文本一次扫描切分为消息段参数，结果按文本缓存
+
+    缓存中只保存不可变的段类型与数据，每次构造消息时重新生成消息段。
+    """
+    tokens: List[_Token] = []
+    text_begin = 0
+    for embed in _EMBED_PATTERN.finditer(msg):
+        start, end = embed.span()
+        if start > text_begin:
+            tokens.append((TextSegment, "text", (("text", msg[text_begin:start]),)))
+        text_begin = end
+        type_ = embed.lastgroup
+        if type_ == "at_all":
+            tokens.append((AtAllSegment, "at_all", ()))
+        else:
+            segment_class, key = _EMBED_SEGMENTS[type_]  # type: ignore
+            tokens.append((segment_class, type_, ((key, embed[type_]),)))  # type: ignore
+    if text_begin < len(msg):
+        tokens.append((TextSegment, "text", (("text", msg[text_begin:]),)))
+    return tuple(tokens)
@@ -0,0 +1,332 @@
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+)
+
+from nonebot.drivers import URL, HTTPServerSetup, Request, Response
+
+from .utils import log
+
+if TYPE_CHECKING:
+    from .adapter import Adapter
+
+M = TypeVar("M", bound="Metric")
+
+Labels = Tuple[str, ...]
+Sample = Tuple[str, Dict[str, str], float]
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Metric:
+    type = "untyped"
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: Dict[str, Any]) -> Labels:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key: Labels) -> Dict[str, str]:
+        return dict(zip(self.labelnames, key))
+
+    def samples(self) -> Iterator[Sample]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    """只增不减的计数"""
+
+    type = "counter"
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: Any) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> Iterator[Sample]:
+        for key, value in self._values.items():
+            yield f"{self.name}_total", self._labels(key), value
+
+
+class Gauge(Metric):
+    """采集时由 `collect` 读取当前值，不在热点路径上更新"""
+
+    type = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str],
+        collect: Callable[[], Iterable[Tuple[Labels, Optional[float]]]],
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.collect = collect
+
+    def samples(self) -> Iterator[Sample]:
+        for key, value in self.collect():
+            if value is not None:
+                yield self.name, self._labels(key), value
+
+
+class Histogram(Metric):
+    """按上界分桶统计的分布，如耗时"""
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values: Dict[Labels, Tuple[List[int], List[float]]] = {}
+        """各标签组合的分桶计数与 `[sum]`，最后一个桶为 +Inf"""
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        if (item := self._values.get(key)) is None:
+            item = self._values[key] = ([0] * (len(self.buckets) + 1), [0.0])
+        counts, total = item
+        counts[bisect_left(self.buckets, value)] += 1
+        total[0] += value
+
+    def count(self, **labels: Any) -> int:
+        item = self._values.get(self._key(labels))
+        return sum(item[0]) if item else 0
+
+    def sum(self, **labels: Any) -> float:
+        item = self._values.get(self._key(labels))
+        return item[1][0] if item else 0.0
+
+    def samples(self) -> Iterator[Sample]:
+        for key, (counts, total) in self._values.items():
+            labels = self._labels(key)
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                yield (
+                    f"{self.name}_bucket",
+                    {**labels, "le": _format_value(bound)},
+                    cumulative,
+                )
+            yield f"{self.name}_sum", labels, total[0]
+            yield f"{self.name}_count", labels, cumulative
+
+
+class MetricsRegistry:
+    """适配器的指标集合
+
+    指标只在内存中累加，由导出器在采集时读取，也可以在进程内通过 `snapshot()` 获取。
+    """
+
+    def __init__(self) -> None:
+        self.metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: M) -> M:
+        if metric.name in self.metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self.metrics[metric.name] = metric
+        return metric
+
+    def get(self, name: str) -> Optional[Metric]:
+        return self.metrics.get(name)
+
+    def collect(self) -> Iterator[Tuple[Metric, List[Sample]]]:
+        for metric in self.metrics.values():
+            yield metric, list(metric.samples())
+
+    def snapshot(self) -> Dict[str, List[Dict[str, Any]]]:
+        """所有样本的当前值，按样本名分组"""
+        result: Dict[str, List[Dict[str, Any]]] = {}
+        for _, samples in self.collect():
+            for name, labels, value in samples:
+                result.setdefault(name, []).append({"labels": labels, "value": value})
+        return result
+
+
+class AdapterMetrics(MetricsRegistry):
+    """适配器内置的事件、接口调用与连接指标"""
+
+    def __init__(self, adapter: "Adapter") -> None:
+        super().__init__()
+        self.adapter = adapter
+        self.events_received = self.register(
+            Counter(
+                "dodo_events_received",
+                "Events received from websocket",
+                ("bot", "event_type"),
+            )
+        )
+        self.events_parsed = self.register(
+            Counter(
+                "dodo_events_parsed",
+                "Events parsed successfully",
+                ("bot", "event_type"),
+            )
+        )
+        self.events_failed = self.register(
+            Counter(
+                "dodo_events_failed",
+                "Events failed to parse or handle",
+                ("bot", "event_type", "stage"),
+            )
+        )
+        self.dispatch_latency = self.register(
+            Histogram(
+                "dodo_dispatch_queue_seconds",
+                "Time events spent waiting in the dispatch queue",
+                ("bot",),
+            )
+        )
+        self.api_latency = self.register(
+            Histogram(
+                "dodo_api_request_seconds",
+                "API request latency",
+                ("bot", "route"),
+            )
+        )
+        self.api_responses = self.register(
+            Counter(
+                "dodo_api_responses",
+                "API responses by HTTP status and DoDo status code",
+                ("bot", "route", "http_status", "status"),
+            )
+        )
+        self.reconnects = self.register(
+            Counter("dodo_reconnects", "Websocket reconnections", ("bot",))
+        )
+        self.outage = self.register(
+            Histogram(
+                "dodo_outage_seconds",
+                "Time between losing and re-establishing the websocket",
+                ("bot",),
+                buckets=(1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0),
+            )
+        )
+        self.bytes = self.register(
+            Counter(
+                "dodo_bytes",
+                "Bytes sent and received (websocket text frames in characters)",
+                ("bot", "transport", "direction"),
+            )
+        )
+        self.register(
+            Gauge(
+                "dodo_connected",
+                "Whether the websocket is connected",
+                ("bot",),
+                lambda: self._per_bot(lambda bot: float(bot.connection.connected)),
+            )
+        )
+        self.register(
+            Gauge(
+                "dodo_dispatch_queue_size",
+                "Events waiting in the dispatch queue",
+                ("bot",),
+                lambda: self._per_bot(lambda bot: bot.dispatcher.qsize()),
+            )
+        )
+        self.register(
+            Gauge(
+                "dodo_heartbeat_rtt_seconds",
+                "Moving average of heartbeat round-trip time",
+                ("bot",),
+                lambda: self._per_bot(lambda bot: bot.connection.heartbeat.ewma_rtt),
+            )
+        )
+
+    def _per_bot(
+        self, value: Callable[[Any], Optional[float]]
+    ) -> Iterator[Tuple[Labels, Optional[float]]]:
+        for bot_id, bot in self.adapter.bots.items():
+            yield (bot_id,), value(bot)
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+def prometheus_text(registry: MetricsRegistry) -> str:
+    """以 Prometheus 文本格式输出所有指标"""
+    lines: List[str] = []
+    for metric, samples in registry.collect():
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.type}")
+        for name, labels, value in samples:
+            if labels:
+                label_text = ",".join(
+                    f'{key}="{_escape(label)}"' for key, label in labels.items()
+                )
+                name = f"{name}{{{label_text}}}"
+            lines.append(f"{name} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+class MetricsExporter(ABC):
+    """指标导出器，适配器初始化时调用 `setup`"""
+
+    @abstractmethod
+    def setup(self, adapter: "Adapter", registry: MetricsRegistry) -> None:
+        raise NotImplementedError
+
+
+class PrometheusExporter(MetricsExporter):
+    """在驱动器的 HTTP 服务上提供 Prometheus 采集路由，需要驱动器支持 HTTP 服务端"""
+
+    def __init__(self, path: str = "/dodo/metrics") -> None:
+        self.path = path
+
+    def setup(self, adapter: "Adapter", registry: MetricsRegistry) -> None:
+        async def handle(request: Request) -> Response:
+            return Response(
+                200,
+                headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+                content=prometheus_text(registry),
+            )
+
+        try:
+            adapter.setup_http_server(
+                HTTPServerSetup(URL(self.path), "GET", "DoDo Metrics", handle)
+            )
+        except TypeError:
+            log(
+                "WARNING",
+                f"Current driver {adapter.config.driver} does not support "
+                "http server, metrics route is not available",
+            )
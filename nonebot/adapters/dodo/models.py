@@ -1,6 +1,7 @@
 from datetime import datetime
 from enum import IntEnum
 from typing import (
+    TYPE_CHECKING,
     Any,
     ClassVar,
     Generic,
@@ -17,11 +18,15 @@ from nonebot.compat import PYDANTIC_V2, ConfigDict
 from pydantic import (
     BaseModel as PydanticBaseModel,
     Field,
+    PrivateAttr,
 )
 
 from .compat import GenericModel
 from .utils import to_lower_camel
 
+if TYPE_CHECKING:
+    from .picture import PictureFile
+
 T = TypeVar("T")
 
 
@@ -558,6 +563,19 @@ class CardRemark(BaseModel):
 class CardImage(BaseModel):
     type: Literal["image"] = Field(default="image", init=False)
     src: str
+    _file: Any = PrivateAttr(default=None)
+
+    @classmethod
+    def from_file(cls, file: "PictureFile") -> "CardImage":
+        """本地图片，发送时自动上传并填入 `src`"""
+        image = cls(src="")
+        image._file = file
+        return image
+
+    @property
+    def file(self) -> Optional["PictureFile"]:
+        """尚未上传的本地图片"""
+        return self._file
 
 
 ### 多图 ###
@@ -0,0 +1,341 @@
+import asyncio
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+import hashlib
+from io import BytesIO
+from pathlib import Path
+import sqlite3
+import struct
+from tempfile import SpooledTemporaryFile
+import time
+from typing import (
+    IO,
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
+
+from .models import PictureInfo
+from .utils import log
+
+PictureFile = Union[bytes, BytesIO, Path, IO[bytes], AsyncIterable[bytes]]
+
+CHUNK_SIZE = 64 * 1024
+SPOOL_MAX_SIZE = 1024 * 1024
+"""不可随机读取的数据流超过该大小后暂存到临时文件"""
+PROBE_SIZE = 64 * 1024
+"""读取网络图片宽高时先请求的文件头字节数"""
+
+
+def content_hash(data: Union[bytes, memoryview]) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _hash_stream(file: IO[bytes]) -> str:
+    hasher = hashlib.sha256()
+    while chunk := file.read(CHUNK_SIZE):
+        hasher.update(chunk)
+    file.seek(0)
+    return hasher.hexdigest()
+
+
+async def picture_hash(file: Union[bytes, IO[bytes]]) -> str:
+    """计算图片内容哈希，文件在线程池中分块读取"""
+    if isinstance(file, bytes):
+        return content_hash(file)
+    if isinstance(file, BytesIO):
+        return content_hash(file.getbuffer())
+    return await asyncio.get_running_loop().run_in_executor(None, _hash_stream, file)
+
+
+@asynccontextmanager
+async def open_picture(file: PictureFile) -> AsyncIterator[Union[bytes, IO[bytes]]]:
+    """将各种来源的图片统一为 bytes 或可随机读取的文件对象，不将文件整体读入内存
+
+    文件对象总是从头读取，无法随机读取的数据流与异步迭代器会先分块写入临时文件。
+    """
+    if isinstance(file, bytes):
+        yield file
+    elif isinstance(file, Path):
+        with file.open("rb") as f:
+            yield f
+    elif isinstance(file, AsyncIterable):
+        with SpooledTemporaryFile(SPOOL_MAX_SIZE) as f:
+            async for chunk in file:
+                f.write(chunk)
+            f.seek(0)
+            yield f  # type: ignore
+    elif file.seekable():
+        file.seek(0)
+        yield file
+    else:
+        with SpooledTemporaryFile(SPOOL_MAX_SIZE) as f:
+            while chunk := file.read(CHUNK_SIZE):
+                f.write(chunk)
+            f.seek(0)
+            yield f  # type: ignore
+
+
+def _jpeg_size(file: IO[bytes]) -> Optional[Tuple[int, int]]:
+    file.seek(2)
+    while True:
+        marker = file.read(2)
+        while marker[1:] == b"\xff":
+            marker = marker[1:] + file.read(1)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return None
+        code = marker[1]
+        if code == 0x01 or 0xD0 <= code <= 0xD7:
+            continue
+        header = file.read(2)
+        if len(header) < 2:
+            return None
+        (length,) = struct.unpack(">H", header)
+        if 0xC0 <= code <= 0xCF and code not in (0xC4, 0xC8, 0xCC):
+            frame = file.read(5)
+            if len(frame) < 5:
+                return None
+            height, width = struct.unpack(">xHH", frame)
+            return width, height
+        file.seek(length - 2, 1)
+
+
+def _picture_size(file: IO[bytes]) -> Optional[Tuple[int, int]]:
+    head = file.read(30)
+    if head.startswith(b"\x89PNG\r\n\x1a\n") and head[12:16] == b"IHDR":
+        return struct.unpack(">II", head[16:24])
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return struct.unpack("<HH", head[6:10])
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP" and len(head) >= 30:
+        chunk = head[12:16]
+        if chunk == b"VP8 " and head[23:26] == b"\x9d\x01\x2a":
+            width, height = struct.unpack("<HH", head[26:30])
+            return width & 0x3FFF, height & 0x3FFF
+        if chunk == b"VP8L" and head[20] == 0x2F:
+            (bits,) = struct.unpack("<I", head[21:25])
+            return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+        if chunk == b"VP8X":
+            return (
+                int.from_bytes(head[24:27], "little") + 1,
+                int.from_bytes(head[27:30], "little") + 1,
+            )
+        return None
+    if head[:2] == b"\xff\xd8":
+        return _jpeg_size(file)
+    return None
+
+
+def picture_size(file: Union[bytes, IO[bytes]]) -> Optional[Tuple[int, int]]:
+    """从 PNG、JPEG、GIF、WebP 文件头读取图片宽高，无需解码图片
+
+    无法识别时返回 `None`，文件对象读取后会移回开头。
+    """
+    if isinstance(file, bytes):
+        return _picture_size(BytesIO(file))
+    try:
+        return _picture_size(file)
+    finally:
+        file.seek(0)
+
+
+class PictureProcessor:
+    """上传前在线程池中缩小或重新压缩过大的图片
+
+    宽高先从文件头读取，只有超过 `max_dimension` 或 `max_bytes` 的图片才会解码处理，
+    动图不做处理。需要安装 Pillow。
+    """
+
+    def __init__(
+        self,
+        max_dimension: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        quality: int = 85,
+    ) -> None:
+        try:
+            from PIL import Image
+        except ImportError as e:
+            raise RuntimeError(
+                "Picture processing is not available. "
+                "Please install Pillow first to use it."
+            ) from e
+
+        self._image = Image
+        self.max_dimension = max_dimension
+        self.max_bytes = max_bytes
+        self.quality = quality
+
+    async def process(self, file: Union[bytes, IO[bytes]]) -> Union[bytes, IO[bytes]]:
+        return await asyncio.get_running_loop().run_in_executor(
+            None, self._process, file
+        )
+
+    def _oversize(self, file: Union[bytes, IO[bytes]]) -> bool:
+        if self.max_dimension is not None and (size := picture_size(file)):
+            if max(size) > self.max_dimension:
+                return True
+        if self.max_bytes is not None:
+            if isinstance(file, bytes):
+                length = len(file)
+            else:
+                length = file.seek(0, 2)
+                file.seek(0)
+            return length > self.max_bytes
+        return False
+
+    def _process(self, file: Union[bytes, IO[bytes]]) -> Union[bytes, IO[bytes]]:
+        if not self._oversize(file):
+            return file
+        source = BytesIO(file) if isinstance(file, bytes) else file
+        try:
+            with self._image.open(source) as image:
+                format_ = image.format
+                if format_ not in ("JPEG", "PNG", "WEBP") or getattr(
+                    image, "is_animated", False
+                ):
+                    source.seek(0)
+                    return file
+                size = image.size
+                if self.max_dimension is not None:
+                    image.thumbnail((self.max_dimension, self.max_dimension))
+                output = BytesIO()
+                if format_ == "PNG":
+                    image.save(output, format_, optimize=True)
+                else:
+                    image.save(output, format_, quality=self.quality)
+        except (OSError, ValueError, self._image.DecompressionBombError) as e:
+            # files Pillow cannot decode are uploaded as they are
+            log("WARNING", f"Failed to process picture, uploading original: {e!r}")
+            source.seek(0)
+            return file
+        length = source.seek(0, 2)
+        source.seek(0)
+        if image.size == size and output.tell() >= length:
+            return file
+        return output.getvalue()
+
+
+class PictureCache:
+    """按图片内容哈希缓存上传结果，相同图片不再重复上传
+
+    条目在上传 `ttl` 秒后过期，超过 `max_size` 时淘汰最久未使用的条目。
+    指定 `path` 时同时保存到 sqlite 数据库中，重启后仍然有效，需要先调用 `open()` 载入，
+    数据库的读写都在单独的线程中按顺序执行，不阻塞事件循环。
+    """
+
+    def __init__(self, ttl: float, max_size: int, path: Optional[Path] = None) -> None:
+        self.ttl = ttl
+        self.max_size = max_size
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[str, Tuple[float, PictureInfo]]" = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    async def open(self) -> None:
+        """打开数据库并载入未过期的条目，未指定 `path` 时不做任何事"""
+        if self.path is None or self._executor is not None:
+            return
+        self._executor = ThreadPoolExecutor(1, "dodo-picture-cache")
+        rows = await asyncio.get_running_loop().run_in_executor(
+            self._executor, self._load, self.path
+        )
+        for key, url, width, height, uploaded_at in reversed(rows):
+            self._data[key] = (
+                uploaded_at,
+                PictureInfo(url=url, width=width, height=height),
+            )
+
+    def _load(self, path: Path) -> List[Tuple[str, str, int, int, float]]:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        db = self._db = sqlite3.connect(
+            path, isolation_level=None, check_same_thread=False
+        )
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS picture ("
+            "hash TEXT PRIMARY KEY, url TEXT NOT NULL, "
+            "width INTEGER NOT NULL, height INTEGER NOT NULL, "
+            "uploaded_at REAL NOT NULL)"
+        )
+        db.execute(
+            "DELETE FROM picture WHERE uploaded_at <= ?", (time.time() - self.ttl,)
+        )
+        rows = db.execute(
+            "SELECT hash, url, width, height, uploaded_at FROM picture "
+            "ORDER BY uploaded_at DESC LIMIT ?",
+            (self.max_size,),
+        ).fetchall()
+        if len(rows) >= self.max_size:
+            db.execute("DELETE FROM picture WHERE uploaded_at < ?", (rows[-1][4],))
+        return rows
+
+    def _execute(self, sql: str, params: Tuple[Any, ...]) -> None:
+        if self._db is not None:
+            self._db.execute(sql, params)
+
+    def _write(self, sql: str, *params: Any) -> None:
+        if self._executor is not None:
+            future = self._executor.submit(self._execute, sql, params)
+            future.add_done_callback(_log_write_error)
+
+    def get(self, key: str) -> Optional[PictureInfo]:
+        if (item := self._data.get(key)) is not None:
+            uploaded_at, info = item
+            if uploaded_at + self.ttl > time.time():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return info
+            self._delete(key)
+        self.misses += 1
+        return None
+
+    def set(self, key: str, info: PictureInfo) -> None:
+        uploaded_at = time.time()
+        self._data[key] = (uploaded_at, info)
+        self._data.move_to_end(key)
+        self._write(
+            "INSERT OR REPLACE INTO picture VALUES (?, ?, ?, ?, ?)",
+            key,
+            info.url,
+            info.width,
+            info.height,
+            uploaded_at,
+        )
+        while len(self._data) > self.max_size:
+            self._delete(next(iter(self._data)))
+
+    def _delete(self, key: str) -> None:
+        del self._data[key]
+        self._write("DELETE FROM picture WHERE hash = ?", key)
+
+    def clear(self) -> None:
+        self._data.clear()
+        self._write("DELETE FROM picture")
+
+    async def close(self) -> None:
+        """等待未完成的写入后关闭数据库"""
+        executor = self._executor
+        if executor is None:
+            return
+        self._executor = None
+
+        def _close() -> None:
+            executor.shutdown(wait=True)
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+        await asyncio.get_running_loop().run_in_executor(None, _close)
+
+
+def _log_write_error(future: "Future[None]") -> None:
+    if not future.cancelled() and (e := future.exception()) is not None:
+        log("WARNING", f"Failed to write picture cache: {e!r}")
@@ -0,0 +1,74 @@
+import asyncio
+import time
+from typing import Dict
+
+
+class TokenBucket:
+    """令牌桶
+
+    令牌不足时按速率排队等待，而不是直接拒绝。
+    被服务端限流时暂停一段时间并将速率减半，之后每次成功请求逐步恢复。
+    """
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.max_rate = rate
+        self.rate = rate
+        self.capacity = max(capacity, 1.0)
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float) -> None:
+        elapsed = max(now - self._updated, 0.0)
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self._updated = max(now, self._updated)
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def throttle(self, pause: float) -> None:
+        self.rate = max(self.rate / 2, self.max_rate / 10)
+        self.tokens = 0.0
+        self._paused_until = self._updated = time.monotonic() + pause
+
+    def recover(self) -> None:
+        if self.rate < self.max_rate:
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 10)
+
+
+class RateLimiter:
+    """机器人级别与接口级别的请求限速"""
+
+    def __init__(self, bot_rate: float, route_rate: float, pause: float) -> None:
+        self.route_rate = route_rate
+        self.pause = pause
+        self.bot_bucket = TokenBucket(bot_rate, bot_rate)
+        self.route_buckets: Dict[str, TokenBucket] = {}
+
+    def _route_bucket(self, route: str) -> TokenBucket:
+        if (bucket := self.route_buckets.get(route)) is None:
+            bucket = self.route_buckets[route] = TokenBucket(
+                self.route_rate, self.route_rate
+            )
+        return bucket
+
+    async def acquire(self, route: str) -> None:
+        await self._route_bucket(route).acquire()
+        await self.bot_bucket.acquire()
+
+    def throttle(self, route: str) -> None:
+        self._route_bucket(route).throttle(self.pause)
+
+    def recover(self, route: str) -> None:
+        self._route_bucket(route).recover()
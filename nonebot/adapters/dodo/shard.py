@@ -0,0 +1,187 @@
+import asyncio
+import json
+import os
+import signal
+import sys
+import time
+from typing import TYPE_CHECKING, Any, Dict, List, cast
+
+from nonebot import get_plugin_config
+
+from .config import Config
+from .utils import log
+
+if TYPE_CHECKING:
+    from .adapter import Adapter
+    from .bot import Bot
+
+
+def shard_command() -> List[str]:
+    """启动分片进程的命令，与当前进程的启动方式相同"""
+    if argv := getattr(sys, "orig_argv", None):
+        return [sys.executable, *argv[1:]]
+    if not sys.argv or sys.argv[0] in ("", "-c"):
+        raise RuntimeError("Cannot determine how to start shard processes")
+    return [sys.executable, *sys.argv]
+
+
+def is_primary_shard() -> bool:
+    """当前进程是否应运行只需执行一次的任务，如定时任务、定时广播
+
+    主进程与每个分片进程都会加载插件，分片模式下只有 0 号分片返回 `True`，
+    未启用分片时总是返回 `True`。
+    """
+    config = get_plugin_config(Config)
+    return config.shards <= 1 or config.shard_id == 0
+
+
+class ShardSupervisor:
+    """分片模式下的主进程
+
+    以相同的命令启动 `shards` 个分片进程，每个分片只运行部分机器人，插件照常加载。
+    分片进程的 `PORT` 依次设置为主进程端口之后的端口，避免 HTTP 服务端口冲突。
+    分片进程异常退出后按指数退避重启，正常退出（退出码为 0）则不再重启。
+    分片进程通过本地 TCP 连接定期上报负载，连接断开或主进程退出时分片进程也随之退出。
+    """
+
+    def __init__(self, adapter: "Adapter", shards: int) -> None:
+        self.adapter = adapter
+        self.shards = shards
+        self.reports: Dict[int, Dict[str, Any]] = {}
+        """各分片最近一次上报的负载"""
+        self.restarts: Dict[int, int] = {shard_id: 0 for shard_id in range(shards)}
+        self.processes: Dict[int, "asyncio.subprocess.Process"] = {}
+        self._port = 0
+
+    async def run(self) -> None:
+        server = await asyncio.start_server(self._handle_report, "127.0.0.1", 0)
+        self._port = server.sockets[0].getsockname()[1]
+        try:
+            await asyncio.gather(
+                *(self._supervise(shard_id) for shard_id in range(self.shards))
+            )
+        finally:
+            server.close()
+            await asyncio.gather(
+                *(self._stop(process) for process in self.processes.values())
+            )
+
+    async def _supervise(self, shard_id: int) -> None:
+        failures = 0
+        while True:
+            env = {
+                **os.environ,
+                "DODO_SHARDS": str(self.shards),
+                "DODO_SHARD_ID": str(shard_id),
+                "DODO_SHARD_REPORT_PORT": str(self._port),
+                "PORT": str(self.adapter.config.port + 1 + shard_id),
+            }
+            started_at = time.monotonic()
+            process = await asyncio.create_subprocess_exec(*shard_command(), env=env)
+            self.processes[shard_id] = process
+            log("INFO", f"Started shard {shard_id} (pid {process.pid})")
+            code = await process.wait()
+            self.reports.pop(shard_id, None)
+            if code == 0:
+                log("INFO", f"Shard {shard_id} exited normally, not restarting")
+                return
+            if time.monotonic() - started_at > 60:
+                failures = 0
+            delay = min(2**failures, 60)
+            failures += 1
+            self.restarts[shard_id] += 1
+            log(
+                "ERROR",
+                f"<r><bg #f8bbd0>Shard {shard_id} exited with code {code}, "
+                f"restarting in {delay}s</bg #f8bbd0></r>",
+            )
+            await asyncio.sleep(delay)
+
+    async def _stop(self, process: "asyncio.subprocess.Process") -> None:
+        if process.returncode is not None:
+            return
+        process.terminate()
+        try:
+            await asyncio.wait_for(process.wait(), timeout=10)
+        except asyncio.TimeoutError:
+            process.kill()
+
+    async def _handle_report(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            while line := await reader.readline():
+                report = json.loads(line)
+                self.reports[report["shard"]] = report
+                log(
+                    "DEBUG",
+                    f"Shard {report['shard']} load: "
+                    f"cpu {report['cpu']:.0%}, loop lag {report['loop_lag']:.3f}s, "
+                    f"{len(report['bots'])} bots, {report['queued']} queued events",
+                )
+        finally:
+            writer.close()
+
+
+class ShardReporter:
+    """分片进程向主进程定期上报负载
+
+    上报连接断开或父进程变化时认为主进程已退出，向自身发送 `SIGTERM` 正常关闭，
+    避免分片进程在主进程退出后继续运行。
+    """
+
+    def __init__(
+        self, adapter: "Adapter", shard_id: int, port: int, interval: float
+    ) -> None:
+        self.adapter = adapter
+        self.shard_id = shard_id
+        self.port = port
+        self.interval = interval
+        self.loop_lag = 0.0
+
+    def report(self, cpu: float) -> Dict[str, Any]:
+        bots = cast(Dict[str, "Bot"], self.adapter.bots)
+        return {
+            "shard": self.shard_id,
+            "pid": os.getpid(),
+            "cpu": cpu,
+            "loop_lag": self.loop_lag,
+            "bots": sorted(bots),
+            "queued": sum(bot.dispatcher.qsize() for bot in bots.values()),
+            "dropped": sum(bot.dispatcher.total_dropped for bot in bots.values()),
+        }
+
+    async def run(self) -> None:
+        parent = os.getppid()
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", self.port)
+        except OSError as e:
+            self._exit(f"cannot connect to the supervisor: {e!r}")
+            return
+        cpu_time, wall_time = time.process_time(), time.monotonic()
+        try:
+            while True:
+                await asyncio.sleep(self.interval)
+                if os.getppid() != parent:
+                    self._exit("the supervisor process has exited")
+                    return
+                if reader.at_eof():
+                    self._exit("the report connection was closed")
+                    return
+                now = time.monotonic()
+                # the loop wakes up late when it is saturated
+                self.loop_lag = max(now - wall_time - self.interval, 0.0)
+                cpu = (time.process_time() - cpu_time) / (now - wall_time)
+                cpu_time, wall_time = time.process_time(), now
+                try:
+                    writer.write(json.dumps(self.report(cpu)).encode() + b"\n")
+                    await writer.drain()
+                except OSError as e:
+                    self._exit(f"failed to report load: {e!r}")
+                    return
+        finally:
+            writer.close()
+
+    def _exit(self, reason: str) -> None:
+        log("WARNING", f"Stopping shard {self.shard_id}: {reason}")
+        os.kill(os.getpid(), signal.SIGTERM)
@@ -0,0 +1,143 @@
+import asyncio
+from dataclasses import dataclass
+import time
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Literal,
+    Optional,
+)
+
+from .config import BotConfig
+from .connection import Backoff
+from .exception import UnauthorizedException
+from .utils import log
+
+if TYPE_CHECKING:
+    from .bot import Bot
+
+StartupStatus = Literal["pending", "starting", "connecting", "ready", "failed"]
+
+
+@dataclass
+class BotStartup:
+    """单个机器人的启动情况"""
+
+    client_id: str
+    status: StartupStatus = "pending"
+    attempts: int = 0
+    started_at: Optional[float] = None
+    ready_at: Optional[float] = None
+    error: Optional[str] = None
+
+    @property
+    def elapsed(self) -> Optional[float]:
+        """从开始启动到连接成功的时长"""
+        if self.started_at is None or self.ready_at is None:
+            return None
+        return self.ready_at - self.started_at
+
+
+class StartupScheduler:
+    """错峰启动机器人
+
+    每隔 `interval` 秒启动一个机器人，最多同时有 `concurrency` 个机器人
+    在获取信息与连接地址，失败时按指数退避重试 `retries` 次。
+    """
+
+    def __init__(
+        self,
+        *,
+        concurrency: int,
+        interval: float,
+        retries: int,
+        backoff: Callable[[], Backoff],
+    ) -> None:
+        self.concurrency = concurrency
+        self.interval = interval
+        self.retries = retries
+        self.backoff = backoff
+        self.bots: Dict[str, BotStartup] = {}
+
+    async def run(
+        self, bots: List[BotConfig], start: Callable[[BotConfig], Awaitable["Bot"]]
+    ) -> None:
+        self.bots = {bot.client_id: BotStartup(bot.client_id) for bot in bots}
+        semaphore = asyncio.Semaphore(self.concurrency)
+        tasks: List["asyncio.Task[None]"] = []
+        try:
+            for i, bot in enumerate(bots):
+                if i:
+                    await asyncio.sleep(self.interval)
+                await semaphore.acquire()
+                tasks.append(asyncio.create_task(self._start(bot, start, semaphore)))
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+        ready = sum(state.status == "ready" for state in self.bots.values())
+        log("INFO", f"{ready}/{len(self.bots)} bots are ready")
+
+    async def _start(
+        self,
+        config: BotConfig,
+        start: Callable[[BotConfig], Awaitable["Bot"]],
+        semaphore: asyncio.Semaphore,
+    ) -> None:
+        state = self.bots[config.client_id]
+        state.status = "starting"
+        state.started_at = time.monotonic()
+        backoff = self.backoff()
+        try:
+            while True:
+                state.attempts += 1
+                try:
+                    bot = await start(config)
+                    break
+                except Exception as e:
+                    state.error = repr(e)
+                    if state.attempts > self.retries or isinstance(
+                        e, UnauthorizedException
+                    ):
+                        state.status = "failed"
+                        log(
+                            "ERROR",
+                            "<r><bg #f8bbd0>"
+                            f"Failed to start bot {config.client_id}"
+                            "</bg #f8bbd0></r>",
+                            e,
+                        )
+                        return
+                    delay = backoff.next()
+                    log(
+                        "WARNING",
+                        f"Failed to start bot {config.client_id}, "
+                        f"retrying in {delay:.1f}s ({state.attempts}/{self.retries})",
+                        e,
+                    )
+                    await asyncio.sleep(delay)
+        finally:
+            semaphore.release()
+
+        state.status = "connecting"
+        state.error = None
+        await bot.connection.ready.wait()
+        state.status = "ready"
+        state.ready_at = time.monotonic()
+        log("INFO", f"Bot {config.client_id} is ready in {state.elapsed:.1f}s")
+
+    def report(self) -> Dict[str, Dict[str, Any]]:
+        """各机器人的启动状态、尝试次数、耗时与最近一次错误"""
+        return {
+            client_id: {
+                "status": state.status,
+                "attempts": state.attempts,
+                "elapsed": state.elapsed,
+                "error": state.error,
+            }
+            for client_id, state in self.bots.items()
+        }